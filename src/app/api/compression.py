@@ -0,0 +1,28 @@
+# Response compression limited to text payloads
+from starlette.datastructures import Headers
+from starlette.middleware.gzip import GZipMiddleware, GZipResponder
+from starlette.types import Message, Receive, Scope, Send
+
+# JPEGs and multipart JPEG bundles are already compressed; gzipping them only costs CPU
+COMPRESSIBLE_TYPES = ("application/json", "text/")
+
+class _TextGZipResponder(GZipResponder):
+    """GZipResponder that passes non-text responses through untouched."""
+
+    async def send_with_gzip(self, message: Message):
+        await super().send_with_gzip(message)
+        if message["type"] == "http.response.start":
+            content_type = Headers(raw=message["headers"]).get("content-type", "")
+            if not content_type.startswith(COMPRESSIBLE_TYPES):
+                # Same path GZipResponder takes for an already-encoded response
+                self.content_encoding_set = True
+
+class TextGZipMiddleware(GZipMiddleware):
+    """GZipMiddleware that only compresses JSON and text responses."""
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if scope["type"] == "http" and "gzip" in Headers(scope=scope).get("Accept-Encoding", ""):
+            responder = _TextGZipResponder(self.app, self.minimum_size, compresslevel=self.compresslevel)
+            await responder(scope, receive, send)
+            return
+        await self.app(scope, receive, send)
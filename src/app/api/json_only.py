@@ -0,0 +1,37 @@
+# Content-Type guard for JSON endpoints
+from starlette.datastructures import Headers
+from starlette.responses import Response
+from starlette.types import ASGIApp, Receive, Scope, Send
+
+# Same shape as FastAPI's own 422 for a missing JSON body, serialized once
+_REJECT_RESPONSE = Response(
+    content=b'{"detail":[{"type":"missing","loc":["body"],"msg":"Field required","input":null}]}',
+    status_code=422,
+    media_type="application/json"
+)
+
+class JSONOnlyMiddleware:
+    """
+    Reject non-JSON POSTs to JSON endpoints before the body is read.
+
+    Paths are matched exactly or by prefix; any other request passes straight
+    through.
+    """
+
+    def __init__(self, app: ASGIApp, paths=(), prefixes=()):
+        self.app = app
+        self.paths = frozenset(paths)
+        self.prefixes = tuple(prefixes)
+
+    async def __call__(self, scope: Scope, receive: Receive, send: Send):
+        if (
+            scope["type"] == "http"
+            and scope["method"] == "POST"
+            and (scope["path"] in self.paths or scope["path"].startswith(self.prefixes))
+        ):
+            content_type = Headers(scope=scope).get("content-type", "")
+            if content_type.split(";")[0].strip().lower() != "application/json":
+                await _REJECT_RESPONSE(scope, receive, send)
+                return
+
+        await self.app(scope, receive, send)
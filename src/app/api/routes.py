@@ -1,21 +1,74 @@
 # API routes
-from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form
-from fastapi.responses import FileResponse
-from sqlalchemy.orm import Session
-from typing import Dict, List, Optional, Any
-from ..db.database import get_db
+from fastapi import APIRouter, Depends, HTTPException, File, UploadFile, Form, Request, Response
+from fastapi.encoders import jsonable_encoder
+from fastapi.routing import APIRoute
+from fastapi.responses import FileResponse, ORJSONResponse, StreamingResponse
+from sqlalchemy import func, insert, select
+from sqlalchemy.orm import Session, raiseload, sessionmaker
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from ..db.database import get_db, get_session_factory
 from ..models.section import Section
 from ..models.frame import Frame
-from pydantic import BaseModel
-import os
+from pydantic import BaseModel, ConfigDict, TypeAdapter, ValidationError
+import asyncio
+import base64
+import hashlib
 import tempfile
+import uuid
+import weakref
+from datetime import datetime
+from pathlib import Path
 from ..models.video import Video
 from ..services.video_service import VideoService
 from ..services.frame_service import FrameService
-from ..services.langchain_service import LangChainVideoService
-import json
+from ..services.frame_extractor import cached_thumbnail
+from ..services.langchain_service import CHROMA_DIR, LangChainVideoService, transcript_is_processed
+from ..services.simple_embeddings import SimpleEmbeddingService
+from ..services.text_embedding_batcher import TextEmbeddingBatcher
+from ..services import qa_cache
+import numpy as np
+import orjson
+from cachetools import TTLCache
 
-router = APIRouter()
+class ORJSONRequest(Request):
+    """Request whose JSON body is parsed with orjson instead of the stdlib."""
+    
+    async def json(self) -> Any:
+        if not hasattr(self, "_json"):
+            self._json = orjson.loads(await self.body())
+        return self._json
+
+class ORJSONRoute(APIRoute):
+    """Route that hands its endpoint an ORJSONRequest, so body models parse with orjson."""
+    
+    def get_route_handler(self) -> Callable:
+        original_route_handler = super().get_route_handler()
+        
+        async def route_handler(request: Request) -> Response:
+            return await original_route_handler(ORJSONRequest(request.scope, request.receive))
+        
+        return route_handler
+
+router = APIRouter(default_response_class=ORJSONResponse, route_class=ORJSONRoute)
+
+# Resolved once so serving a frame doesn't re-resolve the storage directory
+STORAGE_ROOT = Path("storage").resolve()
+
+# Not-found responses serialized once; handlers return them directly instead
+# of raising HTTPException and going through the exception handler
+_VIDEO_NOT_FOUND = ORJSONResponse(status_code=404, content={"detail": "Video not found"})
+_SECTION_NOT_FOUND = ORJSONResponse(status_code=404, content={"detail": "Section not found"})
+_FRAME_NOT_FOUND = ORJSONResponse(status_code=404, content={"detail": "Frame not found"})
+_FRAME_IMAGE_NOT_FOUND = ORJSONResponse(status_code=404, content={"detail": "Frame image not found"})
+
+# Frame summaries only change when frames are re-extracted, which also clears
+# the entry; only touched from the event loop, so no lock is needed
+_frame_summary_cache: TTLCache = TTLCache(maxsize=1024, ttl=60)
+SUMMARY_SAMPLE_FRAMES = 5
+
+# One frame extraction per video at a time, so concurrent requests can't both
+# pass the "already extracted" check; entries go away once no request holds them
+_extraction_locks: "weakref.WeakValueDictionary[int, asyncio.Lock]" = weakref.WeakValueDictionary()
 
 class VideoUploadRequest(BaseModel):
     url: str
@@ -37,6 +90,15 @@ class ChatRequest(BaseModel):
     conversation_id: Optional[str] = None
     include_visual: bool = False
 
+class VideoResponse(BaseModel):
+    id: int
+    url: str
+    title: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+    
+    model_config = ConfigDict(from_attributes=True)
+
 class SectionResponse(BaseModel):
     id: int
     video_id: int
@@ -44,8 +106,7 @@ class SectionResponse(BaseModel):
     start_time: float
     end_time: float
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
 
 class FrameResponse(BaseModel):
     id: int
@@ -53,21 +114,55 @@ class FrameResponse(BaseModel):
     timestamp: float
     path: str
     
-    class Config:
-        from_attributes = True
+    model_config = ConfigDict(from_attributes=True)
+
+# Request-body validators built once at import; the upload and chat handlers
+# validate the raw body bytes directly instead of going through FastAPI's
+# per-request body parsing
+_UPLOAD_ADAPTER = TypeAdapter(VideoUploadRequest)
+_CHAT_ADAPTER = TypeAdapter(ChatRequest)
+
+def _json_body(adapter: TypeAdapter) -> Dict[str, Any]:
+    """OpenAPI request body for a handler that validates its body by hand."""
+    return {
+        "requestBody": {
+            "content": {"application/json": {"schema": adapter.json_schema()}},
+            "required": True
+        }
+    }
+
+def _validation_error_response(error: ValidationError) -> ORJSONResponse:
+    """422 response shaped like FastAPI's own request validation errors."""
+    errors = [
+        {**err, "loc": ("body", *err["loc"])}
+        for err in error.errors(include_url=False)
+    ]
+    return ORJSONResponse(status_code=422, content={"detail": jsonable_encoder(errors)})
+
+def _video_exists(db: Session, video_id: int) -> bool:
+    """Whether a video row exists, without loading it."""
+    return db.query(Video.id).filter(Video.id == video_id).first() is not None
+
+def get_embedding_service(request: Request) -> SimpleEmbeddingService:
+    """Shared CLIP embedding service, created once in the app lifespan."""
+    return request.app.state.embedding_service
+
+def get_text_embedding_batcher(request: Request) -> TextEmbeddingBatcher:
+    """Shared CLIP query batcher, created once in the app lifespan."""
+    return request.app.state.text_embedding_batcher
 
 @router.get("/")
 async def root():
     """Root endpoint."""
     return {"message": "Multi-Video Analysis API", "version": "2.0 - LangChain Enhanced"}
 
-@router.post("/upload")
-async def upload_video(
-    request: VideoUploadRequest,
-    db: Session = Depends(get_db)
-):
-    """Upload a video and process with LangChain."""
-    url = request.url
+def _process_upload(session_factory: sessionmaker, url: str) -> Dict[str, Any]:
+    """Create the video record, process its transcript and save sections.
+    
+    Runs in a worker thread, so it opens its own database session from the
+    request's session factory.
+    """
+    db = session_factory()
     try:
         video_service = VideoService(db)
         langchain_service = LangChainVideoService(db)
@@ -77,20 +172,24 @@ async def upload_video(
         
         # Process transcript with LangChain (much more reliable!)
         transcript_result = langchain_service.process_transcript(video.id, url)
+        qa_cache.invalidate_video(video.id)
         
         # Generate AI sections if transcript is available
         if transcript_result["success"]:
             sections_data = langchain_service.generate_sections(video.id)
             
-            # Save sections to database
-            for i, section_data in enumerate(sections_data):
-                section = Section(
-                    video_id=video.id,
-                    title=section_data["title"],
-                    start_time=i * 60,  # Approximate timing
-                    end_time=(i + 1) * 60
-                )
-                db.add(section)
+            # Save sections to database (approximate timing) as a single
+            # multi-row INSERT statement
+            if sections_data:
+                db.execute(insert(Section).values([
+                    {
+                        "video_id": video.id,
+                        "title": section_data["title"],
+                        "start_time": i * 60,
+                        "end_time": (i + 1) * 60
+                    }
+                    for i, section_data in enumerate(sections_data)
+                ]))
         else:
             # Create fallback section
             section = Section(
@@ -109,30 +208,59 @@ async def upload_video(
             "transcript": transcript_result,
             "url": url
         }
-        
+    finally:
+        db.close()
+
+@router.post("/upload", openapi_extra=_json_body(_UPLOAD_ADAPTER))
+async def upload_video(
+    request: Request,
+    session_factory: sessionmaker = Depends(get_session_factory)
+):
+    """Upload a video and process with LangChain."""
+    try:
+        upload = _UPLOAD_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        return _validation_error_response(e)
+    
+    try:
+        return await asyncio.to_thread(_process_upload, session_factory, upload.url)
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.get("/videos/{video_id}")
+@router.get("/videos/{video_id}", responses={200: {"model": VideoResponse}})
 async def get_video(video_id: int, db: Session = Depends(get_db)):
     """Get video details."""
-    video = db.query(Video).filter(Video.id == video_id).first()
+    # Relationships aren't part of the response; fail loudly rather than lazy-load them
+    video = db.query(Video).options(raiseload("*")).filter(Video.id == video_id).first()
     if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
-    return video
+        return _VIDEO_NOT_FOUND
+    
+    # Trusted DB data, skip validation
+    return VideoResponse.model_construct(
+        id=video.id,
+        url=video.url,
+        title=video.title,
+        created_at=video.created_at,
+        updated_at=video.updated_at
+    )
 
-@router.get("/sections/{video_id}")
+@router.get("/sections/{video_id}", responses={200: {"model": List[SectionResponse]}})
 async def get_sections(video_id: int, db: Session = Depends(get_db)):
     """Get video sections."""
-    sections = db.query(Section).filter(Section.video_id == video_id).all()
-    return sections
+    rows = db.execute(
+        select(Section.id, Section.video_id, Section.title, Section.start_time, Section.end_time)
+        .where(Section.video_id == video_id)
+    ).mappings().all()
+    if not rows and not _video_exists(db, video_id):
+        return _VIDEO_NOT_FOUND
+    return ORJSONResponse(content=[dict(row) for row in rows])
 
 @router.post("/sections/{section_id}/regenerate")
 async def regenerate_section(section_id: int, db: Session = Depends(get_db)):
     """Regenerate section using LangChain."""
-    section = db.query(Section).filter(Section.id == section_id).first()
+    section = db.query(Section).options(raiseload("*")).filter(Section.id == section_id).first()
     if not section:
-        raise HTTPException(status_code=404, detail="Section not found")
+        return _SECTION_NOT_FOUND
     
     try:
         langchain_service = LangChainVideoService(db)
@@ -143,35 +271,61 @@ async def regenerate_section(section_id: int, db: Session = Depends(get_db)):
             section.title = sections_data[0]["title"]
             db.commit()
         
-        return {"message": "Section regenerated", "section": section}
+        # Trusted DB data, skip validation
+        return {
+            "message": "Section regenerated",
+            "section": SectionResponse.model_construct(
+                id=section.id,
+                video_id=section.video_id,
+                title=section.title,
+                start_time=section.start_time,
+                end_time=section.end_time
+            )
+        }
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
-@router.post("/chat/{video_id}")
+def _ask_question(session_factory: sessionmaker, video_id: int, question: str) -> Dict[str, Any]:
+    """Answer a question about a video in a worker thread with its own session."""
+    db = session_factory()
+    try:
+        langchain_service = LangChainVideoService(db)
+        return qa_cache.cached_ask_question(langchain_service, video_id, question)
+    finally:
+        db.close()
+
+@router.post("/chat/{video_id}", openapi_extra=_json_body(_CHAT_ADAPTER))
 async def chat_with_video(
     video_id: int,
-    request: Dict[str, str],
-    db: Session = Depends(get_db)
+    request: Request,
+    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory)
 ):
     """Chat with video using LangChain QA."""
-    question = request.get("message", "")
+    try:
+        chat = _CHAT_ADAPTER.validate_json(await request.body())
+    except ValidationError as e:
+        return _validation_error_response(e)
+    
+    question = chat.message
     if not question:
         raise HTTPException(status_code=400, detail="Message is required")
     
     # Check if video exists
     video = db.query(Video).filter(Video.id == video_id).first()
     if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
+        return _VIDEO_NOT_FOUND
     
     try:
-        langchain_service = LangChainVideoService(db)
-        result = langchain_service.ask_question(video_id, question)
+        result = qa_cache.get_answer(video_id, question)
+        if result is None:
+            result = await asyncio.to_thread(_ask_question, session_factory, video_id, question)
         
-        return {
+        return ORJSONResponse(content={
             "response": result["answer"],
             "success": result["success"],
             "sources": result.get("sources", [])
-        }
+        })
         
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
@@ -181,67 +335,167 @@ async def chat_with_video(
 
 
 # Simplified endpoints using FrameService (no old dependencies)
-@router.get("/frames/{video_id}")
+@router.get("/frames/{video_id}", responses={200: {"model": List[FrameResponse]}})
 async def get_video_frames(
     video_id: int,
+    request: Request,
     db: Session = Depends(get_db)
 ):
-    """Get frames using simplified FrameService."""
+    """Get frames for a video, answering unchanged polls with 304 Not Modified."""
+    last_updated, frame_count = db.query(
+        func.max(Frame.updated_at), func.count(Frame.id)
+    ).filter(Frame.video_id == video_id).one()
+    if not frame_count and not _video_exists(db, video_id):
+        return _VIDEO_NOT_FOUND
+    
+    etag = '"' + hashlib.md5(f"{video_id}-{last_updated}-{frame_count}".encode()).hexdigest() + '"'
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    
+    # Read-only listing: fetch plain rows instead of hydrating ORM instances
+    rows = db.execute(
+        select(Frame.id, Frame.video_id, Frame.timestamp, Frame.path)
+        .where(Frame.video_id == video_id)
+        .order_by(Frame.timestamp)
+    ).mappings().all()
+    
+    return ORJSONResponse(content=[dict(row) for row in rows], headers=headers)
+
+def _extract_frames(session_factory: sessionmaker, video_id: int) -> Dict[str, Any]:
+    """Download and extract frames in a worker thread with its own session."""
+    db = session_factory()
     try:
         frame_service = FrameService(db)
-        frames = db.query(Frame).filter(Frame.video_id == video_id).all()
-        return frames or []
-    except Exception as e:
-        return []
+        return frame_service.extract_frames(video_id)
+    finally:
+        db.close()
 
 @router.post("/videos/{video_id}/extract-frames")
 async def extract_frames(
     video_id: int,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory)
 ):
     """Extract frames from video using FrameService."""
+    if not _video_exists(db, video_id):
+        return _VIDEO_NOT_FOUND
+    
+    lock = _extraction_locks.get(video_id)
+    if lock is None:
+        lock = _extraction_locks[video_id] = asyncio.Lock()
+    
     try:
-        frame_service = FrameService(db)
-        result = frame_service.extract_frames(video_id)
+        async with lock:
+            result = await asyncio.to_thread(_extract_frames, session_factory, video_id)
+        _frame_summary_cache.pop(video_id, None)
         return result
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error extracting frames: {str(e)}")
 
+def _generate_frame_embeddings(session_factory: sessionmaker, embedding_service,
+                               video_id: int) -> Dict[str, Any]:
+    """Run CLIP over a video's frames in a worker thread with its own session."""
+    db = session_factory()
+    try:
+        return embedding_service.generate_frame_embeddings(db, video_id)
+    finally:
+        db.close()
+
+async def _generate_transcript_embeddings(session_factory: sessionmaker, video_id: int,
+                                          video_url: str) -> Dict[str, Any]:
+    """Embed a video's transcript into the vector store unless it's already there."""
+    db = session_factory()
+    try:
+        langchain_service = LangChainVideoService(db)
+        if await asyncio.to_thread(langchain_service.is_processed, video_id):
+            return {"success": True, "message": "Transcript already processed"}
+        
+        result = await langchain_service.process_transcript_async(video_id, video_url)
+        qa_cache.invalidate_video(video_id)
+        return result
+    finally:
+        db.close()
+
+def _visual_pass_report(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a CLIP frame-embedding pass for the generate-embeddings response."""
+    if not result.get("success"):
+        return {"success": False, "error": result.get("error", "Unknown error")}
+    return {
+        "success": True,
+        "processed": result["processed"],
+        "total_frames": result["total_frames"]
+    }
+
+def _text_pass_report(result: Dict[str, Any]) -> Dict[str, Any]:
+    """Summarize a transcript-embedding pass for the generate-embeddings response."""
+    if "error" in result:
+        return {"success": False, "error": result["error"]}
+    return {
+        "success": result["success"],
+        "message": result["message"],
+        "chunks_count": result.get("chunks_count")
+    }
+
+_PASS_REPORTERS = {"visual": _visual_pass_report, "text": _text_pass_report}
+
 @router.post("/videos/{video_id}/generate-embeddings")
 async def generate_embeddings(
     video_id: int,
-    db: Session = Depends(get_db)
+    options: Optional[EmbeddingGenerationRequest] = None,
+    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    embedding_service: SimpleEmbeddingService = Depends(get_embedding_service)
 ):
-    """Generate CLIP embeddings for video frames."""
+    """Generate CLIP embeddings for video frames and transcript embeddings, concurrently."""
+    options = options or EmbeddingGenerationRequest()
     try:
-        from ..services.simple_embeddings import SimpleEmbeddingService
-        
         # Check if video exists
         video = db.query(Video).filter(Video.id == video_id).first()
         if not video:
-            return {"error": "Video not found", "status": "error"}
+            return _VIDEO_NOT_FOUND
         
         # Check if frames exist
-        frames = db.query(Frame).filter(Frame.video_id == video_id).all()
-        if not frames:
-            return {"error": "No frames found. Extract frames first.", "status": "error"}
+        if options.include_visual:
+            has_frames = db.query(Frame.id).filter(Frame.video_id == video_id).first()
+            if not has_frames:
+                return {"error": "No frames found. Extract frames first.", "status": "error"}
+        
+        # Visual and transcript embeddings don't depend on each other, so the
+        # request takes as long as the slower of the two
+        jobs = {}
+        if options.include_visual:
+            jobs["visual"] = asyncio.to_thread(
+                _generate_frame_embeddings, session_factory, embedding_service, video_id
+            )
+        if options.include_text:
+            jobs["text"] = _generate_transcript_embeddings(session_factory, video_id, video.url)
+        results = await asyncio.gather(*jobs.values(), return_exceptions=True)
+        
+        # Each pass is reported on its own, so a transcript/OpenAI failure
+        # doesn't throw away a finished CLIP pass (or the other way round)
+        response = {}
+        for name, result in zip(jobs, results):
+            if isinstance(result, BaseException):
+                result = {"success": False, "error": str(result)}
+            response[name] = _PASS_REPORTERS[name](result)
         
-        # Generate embeddings
-        embedding_service = SimpleEmbeddingService(db)
-        result = embedding_service.generate_frame_embeddings(video_id)
+        succeeded = [name for name in jobs if response[name]["success"]]
+        if len(succeeded) == len(jobs):
+            response["status"] = "success"
+        elif succeeded:
+            response["status"] = "partial"
+        else:
+            response["status"] = "error"
         
-        if result.get("success"):
-            return {
-                "message": f"Generated embeddings for {result['processed']} frames",
-                "status": "success",
-                "processed": result["processed"],
-                "total_frames": result["total_frames"]
-            }
+        if response.get("visual", {}).get("success"):
+            response["message"] = f"Generated embeddings for {response['visual']['processed']} frames"
+        elif response["status"] == "error":
+            response["message"] = "Failed to generate embeddings"
         else:
-            return {
-                "error": result.get("error", "Unknown error"),
-                "status": "error"
-            }
+            response["message"] = "Generated embeddings"
+        return response
         
     except Exception as e:
         return {
@@ -252,13 +506,10 @@ async def generate_embeddings(
 @router.get("/videos/{video_id}/embeddings-status")
 async def get_embeddings_status(
     video_id: int,
-    db: Session = Depends(get_db)
+    embedding_service: SimpleEmbeddingService = Depends(get_embedding_service)
 ):
     """Check if embeddings exist for a video."""
     try:
-        from ..services.simple_embeddings import SimpleEmbeddingService
-        
-        embedding_service = SimpleEmbeddingService(db)
         status = embedding_service.get_embeddings_status(video_id)
         return status
         
@@ -267,83 +518,171 @@ async def get_embeddings_status(
 
 # Visual Search Endpoints
 
+def _format_visual_results(raw_results: List[Dict[str, Any]], search_type: str) -> List[Dict[str, Any]]:
+    """Format results for frontend (convert similarity to score and add match_type)."""
+    return [
+        {
+            "frame_id": result["frame_id"],
+            "timestamp": result["timestamp"],
+            "path": result["path"],
+            "score": result["similarity"],  # Convert similarity to score
+            "match_type": "visual" if search_type == "visual" else "hybrid"
+        }
+        for result in raw_results
+    ]
+
+def _search_visual_content(session_factory: sessionmaker, embedding_service, video_id: int,
+                           query: str, limit: int, text_embedding=None) -> List[Dict[str, Any]]:
+    """Run CLIP search in a worker thread with its own session."""
+    db = session_factory()
+    try:
+        return embedding_service.search_visual_content(
+            db, video_id, query, limit, text_embedding=text_embedding
+        )
+    finally:
+        db.close()
+
+def _sse_event(event: str, data: Any) -> str:
+    """Encode a single Server-Sent Event."""
+    return f"event: {event}\ndata: {orjson.dumps(data).decode()}\n\n"
+
 @router.get("/visual-search/{video_id}")
 async def visual_search(
     video_id: int,
     query: str,
     search_type: str = "hybrid",
     limit: int = 20,
-    db: Session = Depends(get_db)
+    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    embedding_service: SimpleEmbeddingService = Depends(get_embedding_service),
+    text_embedding_batcher: TextEmbeddingBatcher = Depends(get_text_embedding_batcher)
 ):
     """Visual search using CLIP embeddings."""
     try:
-        from ..services.simple_embeddings import SimpleEmbeddingService
-        
         # Check if video exists
         video = db.query(Video).filter(Video.id == video_id).first()
         if not video:
-            return {"error": "Video not found", "results": []}
-        
-        embedding_service = SimpleEmbeddingService(db)
+            return _VIDEO_NOT_FOUND
         
         if search_type == "visual" or search_type == "hybrid":
-            # Use visual search with CLIP
-            raw_results = embedding_service.search_visual_content(video_id, query, limit)
+            # Use visual search with CLIP; the query is encoded together with
+            # any other searches arriving in the same few milliseconds
+            text_embedding = await text_embedding_batcher.embed(query)
+            raw_results = await asyncio.to_thread(
+                _search_visual_content, session_factory, embedding_service, video_id, query, limit,
+                text_embedding
+            )
             
-            # Format results for frontend (convert similarity to score and add match_type)
-            formatted_results = []
-            for result in raw_results:
-                formatted_results.append({
-                    "frame_id": result["frame_id"],
-                    "timestamp": result["timestamp"],
-                    "path": result["path"],
-                    "score": result["similarity"],  # Convert similarity to score
-                    "match_type": "visual" if search_type == "visual" else "hybrid"
-                })
+            formatted_results = _format_visual_results(raw_results, search_type)
             
             # Add LangChain text search for hybrid mode
             if search_type == "hybrid":
                 try:
-                    langchain_service = LangChainVideoService(db)
-                    qa_result = langchain_service.ask_question(video_id, f"Find information about: {query}")
+                    qa_result = await asyncio.to_thread(
+                        _ask_question, session_factory, video_id, f"Find information about: {query}"
+                    )
                     
                     # Add context from LangChain if available
                     context = qa_result.get("answer", "") if qa_result.get("success") else ""
                     
-                    return {
+                    return ORJSONResponse(content={
                         "query": query,
                         "search_type": search_type,
                         "results": formatted_results,
                         "total_results": len(formatted_results),
                         "context": context[:200] + "..." if len(context) > 200 else context
-                    }
+                    })
                 except Exception as e:
                     print(f"LangChain search failed: {str(e)}")
             
-            return {
+            return ORJSONResponse(content={
                 "query": query,
                 "search_type": search_type,
                 "results": formatted_results,
                 "total_results": len(formatted_results)
-            }
+            })
         else:
             # Text-only search using LangChain
             try:
-                langchain_service = LangChainVideoService(db)
-                qa_result = langchain_service.ask_question(video_id, query)
+                qa_result = await asyncio.to_thread(_ask_question, session_factory, video_id, query)
                 
-                return {
+                return ORJSONResponse(content={
                     "query": query,
                     "search_type": "text",
                     "answer": qa_result.get("answer", "No answer found"),
                     "success": qa_result.get("success", False),
                     "sources": qa_result.get("sources", [])
-                }
+                })
             except Exception as e:
-                return {"error": f"Text search failed: {str(e)}", "results": []}
+                return ORJSONResponse(content={"error": f"Text search failed: {str(e)}", "results": []})
         
     except Exception as e:
-        return {"error": f"Search failed: {str(e)}", "results": []}
+        return ORJSONResponse(content={"error": f"Search failed: {str(e)}", "results": []})
+
+@router.get("/visual-search/{video_id}/stream")
+async def visual_search_stream(
+    video_id: int,
+    query: str,
+    search_type: str = "hybrid",
+    limit: int = 20,
+    db: Session = Depends(get_db),
+    session_factory: sessionmaker = Depends(get_session_factory),
+    embedding_service: SimpleEmbeddingService = Depends(get_embedding_service),
+    text_embedding_batcher: TextEmbeddingBatcher = Depends(get_text_embedding_batcher)
+):
+    """
+    Visual search streamed as Server-Sent Events.
+    
+    Emits a `hit` event with the CLIP results as soon as they are scored,
+    then a `context` (hybrid) or `answer` (text) event once LangChain
+    responds, and finally `done`.
+    """
+    video = db.query(Video).filter(Video.id == video_id).first()
+    if not video:
+        return _VIDEO_NOT_FOUND
+    
+    async def event_stream():
+        try:
+            if search_type == "visual" or search_type == "hybrid":
+                # Start the LangChain call first so it overlaps with CLIP scoring
+                qa_task = None
+                if search_type == "hybrid":
+                    qa_task = asyncio.create_task(asyncio.to_thread(
+                        _ask_question, session_factory, video_id, f"Find information about: {query}"
+                    ))
+                
+                text_embedding = await text_embedding_batcher.embed(query)
+                raw_results = await asyncio.to_thread(
+                    _search_visual_content, session_factory, embedding_service, video_id, query, limit,
+                text_embedding
+                )
+                yield _sse_event("hit", _format_visual_results(raw_results, search_type))
+                
+                if qa_task is not None:
+                    try:
+                        qa_result = await qa_task
+                        context = qa_result.get("answer", "") if qa_result.get("success") else ""
+                        yield _sse_event("context", context[:200] + "..." if len(context) > 200 else context)
+                    except Exception as e:
+                        print(f"LangChain search failed: {str(e)}")
+            else:
+                qa_result = await asyncio.to_thread(_ask_question, session_factory, video_id, query)
+                yield _sse_event("answer", {
+                    "answer": qa_result.get("answer", "No answer found"),
+                    "success": qa_result.get("success", False),
+                    "sources": qa_result.get("sources", [])
+                })
+        except Exception as e:
+            yield _sse_event("error", f"Search failed: {str(e)}")
+        
+        yield _sse_event("done", {"query": query, "search_type": search_type})
+    
+    # Content-Encoding keeps GZipMiddleware from buffering events until the stream ends
+    return StreamingResponse(
+        event_stream(),
+        media_type="text/event-stream",
+        headers={"Content-Encoding": "identity", "Cache-Control": "no-cache"}
+    )
 
 @router.post("/visual-search/{video_id}/image")
 async def visual_search_by_image(
@@ -366,23 +705,146 @@ async def visual_search_by_timestamp(
     """Timestamp search - simplified for LangChain system."""
     return {"message": "Timestamp search not implemented", "results": []}
 
+def _parse_frame_ids(frame_ids: str) -> List[int]:
+    """Parse a comma-separated list of frame ids into int64 values."""
+    if not frame_ids.strip():
+        return []
+    try:
+        return np.array(frame_ids.split(","), dtype=np.int64).tolist()
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=422, detail="frame_ids must be comma-separated integers")
+
+def _parse_thumbnail_size(size: str) -> Tuple[int, int]:
+    """Parse a WIDTHxHEIGHT thumbnail size."""
+    try:
+        width, height = (int(part) for part in size.lower().split("x"))
+    except (ValueError, OverflowError):
+        raise HTTPException(status_code=422, detail="size must look like 200x150")
+    if width <= 0 or height <= 0:
+        raise HTTPException(status_code=422, detail="size must be positive")
+    return width, height
+
+def _build_thumbnails(rows, width: int, height: int) -> Dict[int, bytes]:
+    """JPEG thumbnails for (id, path) frame rows, skipping unreadable files."""
+    thumbnails = {}
+    for row in rows:
+        try:
+            thumbnails[row.id] = cached_thumbnail(row.path, width, height)
+        except Exception as e:
+            print(f"Error creating thumbnail for frame {row.id}: {str(e)}")
+    return thumbnails
+
+def _multipart_thumbnails(thumbnails: Dict[int, bytes]) -> Response:
+    """Send thumbnails as raw JPEG parts of a multipart/mixed body."""
+    boundary = uuid.uuid4().hex
+    parts = []
+    for frame_id, jpeg in thumbnails.items():
+        parts.append(
+            f"--{boundary}\r\nContent-Type: image/jpeg\r\nX-Frame-Id: {frame_id}\r\n\r\n".encode()
+        )
+        parts.append(jpeg)
+        parts.append(b"\r\n")
+    parts.append(f"--{boundary}--\r\n".encode())
+    return Response(content=b"".join(parts), media_type=f"multipart/mixed; boundary={boundary}")
+
 @router.get("/visual-search/{video_id}/thumbnails")
 async def get_frame_thumbnails(
     video_id: int,
     frame_ids: str,  
+    request: Request,
     size: str = "200x150",
     db: Session = Depends(get_db)
 ) -> Dict:
-    """Thumbnails - simplified for LangChain system."""
-    return {"message": "Thumbnails not implemented", "thumbnails": []}
+    """
+    Thumbnails for the given frames of a video.
+    
+    Returned as base64 JPEG data URIs in JSON, or as raw JPEG parts when the
+    client accepts multipart/mixed.
+    """
+    ids = _parse_frame_ids(frame_ids)
+    width, height = _parse_thumbnail_size(size)
+    
+    rows = []
+    if ids:
+        rows = db.execute(
+            select(Frame.id, Frame.path)
+            .where(Frame.video_id == video_id, Frame.id.in_(ids))
+        ).all()
+    
+    thumbnails = await asyncio.to_thread(_build_thumbnails, rows, width, height)
+    
+    if "multipart/mixed" in request.headers.get("accept", ""):
+        return _multipart_thumbnails(thumbnails)
+    
+    return ORJSONResponse(content={
+        "video_id": video_id,
+        "thumbnails": {
+            frame_id: "data:image/jpeg;base64," + base64.b64encode(jpeg).decode("ascii")
+            for frame_id, jpeg in thumbnails.items()
+        },
+        "total_thumbnails": len(thumbnails)
+    })
+
+@router.get("/visual-search/{video_id}/thumbnails/{frame_id}.jpg")
+async def get_frame_thumbnail(
+    video_id: int,
+    frame_id: int,
+    size: str = "200x150",
+    db: Session = Depends(get_db)
+):
+    """A single frame thumbnail as raw JPEG bytes."""
+    width, height = _parse_thumbnail_size(size)
+    
+    row = db.execute(
+        select(Frame.path).where(Frame.id == frame_id, Frame.video_id == video_id)
+    ).first()
+    if not row:
+        return _FRAME_NOT_FOUND
+    
+    try:
+        jpeg = await asyncio.to_thread(cached_thumbnail, row.path, width, height)
+    except FileNotFoundError:
+        return _FRAME_IMAGE_NOT_FOUND
+    
+    return Response(
+        content=jpeg,
+        media_type="image/jpeg",
+        headers={"Cache-Control": "public, max-age=86400"}
+    )
+
+def _build_frame_summary(db: Session, video_id: int) -> Dict[str, Any]:
+    """Summarize a video's extracted frames: count, time span, spacing and a few samples."""
+    rows = db.execute(
+        select(Frame.id, Frame.timestamp, Frame.path)
+        .where(Frame.video_id == video_id)
+        .order_by(Frame.timestamp)
+    ).all()
+    
+    timestamps = [row.timestamp for row in rows]
+    sample_step = max(len(rows) // SUMMARY_SAMPLE_FRAMES, 1)
+    
+    return {
+        "video_id": video_id,
+        "total_frames": len(rows),
+        "duration_covered": timestamps[-1] - timestamps[0] if timestamps else 0.0,
+        "frame_intervals": [later - earlier for earlier, later in zip(timestamps, timestamps[1:])],
+        "sample_frames": [
+            {"frame_id": row.id, "timestamp": row.timestamp, "path": row.path}
+            for row in rows[::sample_step][:SUMMARY_SAMPLE_FRAMES]
+        ]
+    }
 
 @router.get("/visual-search/{video_id}/summary")
 async def get_video_frame_summary(
     video_id: int,
     db: Session = Depends(get_db)
 ) -> Dict:
-    """Frame summary - simplified for LangChain system."""
-    return {"message": "Frame summary not implemented", "summary": {}}
+    """Frame summary, cached per video until frames are re-extracted."""
+    summary = _frame_summary_cache.get(video_id)
+    if summary is None:
+        summary = _build_frame_summary(db, video_id)
+        _frame_summary_cache[video_id] = summary
+    return ORJSONResponse(content=summary)
 
 # Static file serving for frames
 @router.get("/frames/storage/{file_path:path}")
@@ -392,23 +854,21 @@ async def serve_frame_image(file_path: str):
     This endpoint provides access to extracted frame images.
     """
     try:
-        # Construct the full path to the frame file
-        storage_path = os.path.join("storage", file_path)
-        
-        # Check if file exists and is within storage directory (security check)
-        if not os.path.exists(storage_path):
-            raise HTTPException(status_code=404, detail="Frame image not found")
+        target = (STORAGE_ROOT / file_path).resolve(strict=False)
         
         # Ensure the path is within the storage directory (prevent directory traversal)
-        abs_storage_path = os.path.abspath(storage_path)
-        abs_storage_dir = os.path.abspath("storage")
-        if not abs_storage_path.startswith(abs_storage_dir):
+        if not target.is_relative_to(STORAGE_ROOT):
             raise HTTPException(status_code=403, detail="Access denied")
         
+        if not target.is_file():
+            return _FRAME_IMAGE_NOT_FOUND
+        
+        # Frame files never change once written, so let browsers keep them
         return FileResponse(
-            path=storage_path,
+            path=target,
             media_type="image/jpeg",
-            filename=os.path.basename(file_path)
+            filename=target.name,
+            headers={"Cache-Control": "public, max-age=31536000, immutable"}
         )
         
     except HTTPException:
@@ -422,24 +882,23 @@ async def process_with_langchain(video_id: int, db: Session = Depends(get_db)):
     """Process video with LangChain (transcript + embeddings)."""
     video = db.query(Video).filter(Video.id == video_id).first()
     if not video:
-        raise HTTPException(status_code=404, detail="Video not found")
+        return _VIDEO_NOT_FOUND
     
     try:
         langchain_service = LangChainVideoService(db)
         result = langchain_service.process_transcript(video_id, video.url)
+        qa_cache.invalidate_video(video_id)
         return result
     except Exception as e:
         raise HTTPException(status_code=400, detail=str(e))
 
 @router.get("/langchain/status/{video_id}")
-async def get_langchain_status(video_id: int, db: Session = Depends(get_db)):
+async def get_langchain_status(video_id: int):
     """Check if LangChain processing is complete for a video."""
-    from pathlib import Path
-    
-    chroma_dir = Path(f"storage/chroma/video_{video_id}")
+    processed = await asyncio.to_thread(transcript_is_processed, video_id)
     
     return {
         "video_id": video_id,
-        "processed": chroma_dir.exists(),
-        "chroma_path": str(chroma_dir) if chroma_dir.exists() else None
+        "processed": processed,
+        "chroma_path": CHROMA_DIR if processed else None
     } 
\ No newline at end of file
@@ -1,9 +1,12 @@
 # DB session management
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy.orm import Session, sessionmaker
+from fastapi import Depends
 import os
+from pathlib import Path
 from dotenv import load_dotenv
+from filelock import FileLock
 
 # Load environment variables
 load_dotenv()
@@ -14,6 +17,16 @@ DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./video_analysis.db")
 # Create SQLAlchemy engine
 if DATABASE_URL.startswith("sqlite"):
     engine = create_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+    # WAL lets frame/status polling read while a long extraction write is open
+    @event.listens_for(engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        cursor.execute("PRAGMA mmap_size=268435456")  # 256 MB
+        cursor.close()
 else:
     engine = create_engine(
         DATABASE_URL,
@@ -37,6 +50,19 @@ def get_db():
     finally:
         db.close()
 
+# Dependency for code that needs its own sessions (e.g. worker threads); they
+# share the request session's bind, so get_db overrides carry over
+def get_session_factory(db: Session = Depends(get_db)) -> sessionmaker:
+    return sessionmaker(autocommit=False, autoflush=False, bind=db.get_bind())
+
 # Function to initialize database
 def init_db():
-    Base.metadata.create_all(bind=engine) 
\ No newline at end of file
+    Base.metadata.create_all(bind=engine)
+
+# Run DDL in one worker at a time; create_all skips tables that already exist
+def init_db_once(storage_dir: str = "storage"):
+    storage = Path(storage_dir)
+    storage.mkdir(parents=True, exist_ok=True)
+    
+    with FileLock(str(storage / ".initdb.lock")):
+        init_db()
@@ -1,21 +1,49 @@
 # FastAPI app entrypoint 
 import os
+import asyncio
+from contextlib import asynccontextmanager
 from dotenv import load_dotenv
 
 # Load environment variables from .env file
 load_dotenv()
 
-from fastapi import FastAPI
+from fastapi import FastAPI, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
+from fastapi.utils import is_body_allowed_for_status_code
+from starlette.exceptions import HTTPException as StarletteHTTPException
+from langchain.globals import set_llm_cache
+from langchain_community.cache import SQLiteCache
+from .api.compression import TextGZipMiddleware
+from .api.json_only import JSONOnlyMiddleware
 from .api.routes import router as api_router
-from .db.database import init_db
+from .db.database import init_db_once
+from .services.simple_embeddings import SimpleEmbeddingService
+from .services.text_embedding_batcher import TextEmbeddingBatcher
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Initialize database on startup without blocking the event loop
+    await asyncio.to_thread(init_db_once)
+    # Cache LLM responses (keyed on prompt + model settings) so repeated
+    # questions skip the GPT-4 round trip; init_db_once creates storage/
+    set_llm_cache(SQLiteCache(database_path="storage/llm_cache.db"))
+    # Shared across requests so the CLIP model is only loaded once
+    app.state.embedding_service = SimpleEmbeddingService()
+    app.state.text_embedding_batcher = TextEmbeddingBatcher(app.state.embedding_service)
+    yield
 
 app = FastAPI(
     title="Multi-Video Analysis API",
     description="API for analyzing and processing multiple videos with transcript and visual search capabilities",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse,
+    lifespan=lifespan
 )
 
+# Upload and chat only accept JSON; reject anything else before reading the body
+app.add_middleware(JSONOnlyMiddleware, paths={"/api/upload"}, prefixes=("/api/chat/",))
+
 # Configure CORS
 app.add_middleware(
     CORSMiddleware,
@@ -25,6 +53,18 @@ app.add_middleware(
     allow_headers=["*"],  # Allows all headers
 )
 
+# Compress larger JSON responses such as frame and section listings; images
+# are left as they are
+app.add_middleware(TextGZipMiddleware, minimum_size=1024)
+
+@app.exception_handler(StarletteHTTPException)
+async def orjson_http_exception_handler(request: Request, exc: StarletteHTTPException):
+    """Serialize HTTP errors with orjson, skipping jsonable_encoder on the detail."""
+    headers = getattr(exc, "headers", None)
+    if not is_body_allowed_for_status_code(exc.status_code):
+        return Response(status_code=exc.status_code, headers=headers)
+    return ORJSONResponse(status_code=exc.status_code, content={"detail": exc.detail}, headers=headers)
+
 # Include API routes
 app.include_router(api_router, prefix="/api")
 
@@ -32,11 +72,9 @@ app.include_router(api_router, prefix="/api")
 async def root():
     return {"message": "Welcome to Multi-Video Analysis API"}
 
+# The health response never changes, so it's serialized once and reused
+_HEALTH_RESPONSE = Response(content=b'{"status":"healthy"}', media_type="application/json")
+
 @app.get("/health")
 async def health_check():
-    return {"status": "healthy"}
-
-# Initialize database on startup
-@app.on_event("startup")
-async def startup_event():
-    init_db()
\ No newline at end of file
+    return _HEALTH_RESPONSE
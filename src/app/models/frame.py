@@ -1,14 +1,17 @@
 # Frame model
-from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime
+from sqlalchemy import Column, Integer, String, Float, ForeignKey, DateTime, Index
 from sqlalchemy.orm import relationship
 from datetime import datetime
 from ..db.database import Base
 
 class Frame(Base):
     __tablename__ = "frames"
+    __table_args__ = (
+        Index("ix_frames_video_ts", "video_id", "timestamp"),
+    )
 
     id = Column(Integer, primary_key=True, index=True)
-    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"))
+    video_id = Column(Integer, ForeignKey("videos.id", ondelete="CASCADE"), index=True)
     timestamp = Column(Float)  # Time in seconds
     path = Column(String)      # Path to the stored frame image
     created_at = Column(DateTime, default=datetime.utcnow)
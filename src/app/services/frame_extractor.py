@@ -1,14 +1,81 @@
 # Frame extraction
 import ffmpeg
+import io
 import os
 import tempfile
 from pathlib import Path
+from PIL import Image
+from sqlalchemy import func, select
 from sqlalchemy.orm import Session
 from ..models.video import Video
 from ..models.frame import Frame
-from typing import List, Optional
+from typing import Any, Dict, List, Optional
+import math
 import shutil
+import threading
 import yt_dlp
+from concurrent.futures import ThreadPoolExecutor
+from cachetools import LRUCache
+
+# Memory budget for encoded thumbnails kept between requests
+THUMBNAIL_CACHE_BYTES = 64 * 1024 * 1024
+
+def _extract_segment(video_path: str, out_dir: Path, interval: int, segment_index: int,
+                     start: float, length: float) -> List[tuple]:
+    """
+    Decode one segment of a video and sample a frame every interval seconds.
+    
+    Returns:
+        List of (file_path, timestamp) tuples for the segment
+    """
+    out_pattern = str(out_dir / f"frame_{segment_index:03d}_%06d.jpg")
+    (
+        ffmpeg
+        .input(video_path, ss=start, t=length)
+        .filter('fps', fps=1.0 / interval)
+        .output(out_pattern, vsync='vfr', qscale=2, format='image2')
+        .overwrite_output()
+        .run(capture_stdout=True, capture_stderr=True)
+    )
+    
+    frame_data = []
+    for i, frame_path in enumerate(sorted(out_dir.glob(f"frame_{segment_index:03d}_*.jpg"))):
+        timestamp = start + i * interval
+        # The fps filter can emit a trailing frame at the segment boundary,
+        # which belongs to the next segment
+        if timestamp >= start + length:
+            frame_path.unlink()
+            continue
+        frame_data.append((str(frame_path), timestamp))
+    
+    return frame_data
+
+def make_thumbnail(path: str, width: int, height: int) -> bytes:
+    """Downscale a frame image to fit within width x height and encode it as JPEG."""
+    with Image.open(path) as image:
+        # Let the JPEG decoder scale down while decoding instead of after
+        image.draft('RGB', (width, height))
+        image = image.convert('RGB')
+        image.thumbnail((width, height))
+        
+        buffer = io.BytesIO()
+        image.save(buffer, format='JPEG', quality=85)
+        return buffer.getvalue()
+
+# Encoded thumbnails keyed by (path, mtime, width, height), bounded by total bytes
+_thumbnail_cache: LRUCache = LRUCache(maxsize=THUMBNAIL_CACHE_BYTES, getsizeof=len)
+_thumbnail_lock = threading.Lock()
+
+def cached_thumbnail(path: str, width: int, height: int) -> bytes:
+    """make_thumbnail, reusing the encoded bytes until the image file changes."""
+    key = (path, os.stat(path).st_mtime_ns, width, height)
+    with _thumbnail_lock:
+        jpeg = _thumbnail_cache.get(key)
+    if jpeg is None:
+        jpeg = make_thumbnail(path, width, height)
+        with _thumbnail_lock:
+            _thumbnail_cache[key] = jpeg
+    return jpeg
 
 class FrameExtractorService:
     def __init__(self, db: Session):
@@ -29,30 +96,26 @@ class FrameExtractorService:
                 'format': 'best[ext=mp4]/best',  # Prefer mp4, fallback to best
                 'quiet': True,
                 'no_warnings': True,
+                'concurrent_fragment_downloads': 4,  # Parallel DASH/HLS fragments
             }
             
             with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # Extract info first to get the filename
-                info = ydl.extract_info(video_url, download=False)
-                video_id = info.get('id', 'unknown')
-                ext = info.get('ext', 'mp4')
+                # Resolve formats and download in one pass; the info dict
+                # reports where the file was written
+                info = ydl.extract_info(video_url, download=True)
                 
-                # Set the expected output filename
-                output_filename = os.path.join(output_path, f'video_{video_id}.{ext}')
+                requested_downloads = info.get('requested_downloads') or []
+                if requested_downloads:
+                    output_filename = requested_downloads[0].get('filepath')
+                    if output_filename and os.path.exists(output_filename):
+                        return output_filename
                 
-                # Download the video
-                ydl.download([video_url])
+                # Fallback: look for any video file in the directory
+                for file in os.listdir(output_path):
+                    if file.startswith('video_') and file.endswith(('.mp4', '.webm', '.mkv')):
+                        return os.path.join(output_path, file)
                 
-                # Check if file exists and return the path
-                if os.path.exists(output_filename):
-                    return output_filename
-                else:
-                    # Fallback: look for any video file in the directory
-                    for file in os.listdir(output_path):
-                        if file.startswith('video_') and file.endswith(('.mp4', '.webm', '.mkv')):
-                            return os.path.join(output_path, file)
-                    
-                    raise Exception("Downloaded video file not found")
+                raise Exception("Downloaded video file not found")
             
         except Exception as e:
             raise Exception(f"Error downloading video with yt-dlp: {str(e)}")
@@ -61,6 +124,10 @@ class FrameExtractorService:
         """
         Extract frames from video at specified intervals using FFmpeg.
         
+        Constant frame rate sources are sampled from keyframes only, which
+        skips decoding every P/B frame. Variable frame rate sources fall back
+        to the full-decode path in extract_frames_naive.
+        
         Args:
             video_path: Path to the video file
             video_id: Database ID of the video
@@ -70,48 +137,91 @@ class FrameExtractorService:
             List of frame file paths
         """
         try:
-            # Create output directory for this video
-            video_frames_dir = self.frames_dir / str(video_id)
-            video_frames_dir.mkdir(exist_ok=True)
-            
             # Get video info
             probe = ffmpeg.probe(video_path)
             video_info = next(s for s in probe['streams'] if s['codec_type'] == 'video')
-            duration = float(video_info['duration'])
             
-            frame_paths = []
-            timestamps = []
+            if video_info.get('avg_frame_rate') != video_info.get('r_frame_rate'):
+                return self.extract_frames_naive(video_path, video_id, interval)
             
-            # Calculate timestamps for frame extraction
-            current_time = 0
-            frame_count = 0
+            video_frames_dir = self._prepare_frames_dir(video_id)
+            out_pattern = str(video_frames_dir / "frame_%06d.jpg")
             
-            while current_time < duration:
-                timestamp = current_time
-                frame_filename = f"frame_{frame_count:06d}_{timestamp:.2f}s.jpg"
-                frame_path = video_frames_dir / frame_filename
-                
-                # Extract frame at specific timestamp
-                (
-                    ffmpeg
-                    .input(video_path, ss=timestamp)
-                    .output(str(frame_path), vframes=1, format='image2', vcodec='mjpeg')
-                    .overwrite_output()
-                    .run(capture_stdout=True, capture_stderr=True)
-                )
-                
-                if frame_path.exists():
-                    frame_paths.append(str(frame_path))
-                    timestamps.append(timestamp)
-                
-                current_time += interval
-                frame_count += 1
+            # Decode keyframes only; the fps filter then picks the nearest
+            # keyframe for each interval
+            (
+                ffmpeg
+                .input(video_path, skip_frame='nokey')
+                .filter('fps', fps=1.0 / interval)
+                .output(out_pattern, vsync='vfr', qscale=2, format='image2')
+                .overwrite_output()
+                .run(capture_stdout=True, capture_stderr=True)
+            )
             
-            return list(zip(frame_paths, timestamps))
+            return self._collect_frames(video_frames_dir, interval)
             
         except Exception as e:
             raise Exception(f"Error extracting frames: {str(e)}")
 
+    def extract_frames_naive(self, video_path: str, video_id: int, interval: int = 10) -> List[str]:
+        """
+        Extract frames by fully decoding the video, for accurate sampling of
+        variable frame rate sources.
+        
+        Args:
+            video_path: Path to the video file
+            video_id: Database ID of the video
+            interval: Interval in seconds between frame extractions
+            
+        Returns:
+            List of frame file paths
+        """
+        try:
+            video_frames_dir = self._prepare_frames_dir(video_id)
+            
+            probe = ffmpeg.probe(video_path)
+            duration = float(probe['format']['duration'])
+            
+            # Full decoding is CPU-bound, so split the video into one
+            # interval-aligned segment per core and decode them side by side
+            sample_count = max(1, math.ceil(duration / interval))
+            worker_count = min(os.cpu_count() or 1, sample_count)
+            segment_length = math.ceil(sample_count / worker_count) * interval
+            segment_starts = [
+                float(start) for start in range(0, math.ceil(duration), segment_length)
+            ]
+            
+            # Each segment runs in its own ffmpeg process, so threads are
+            # enough to keep every core busy
+            with ThreadPoolExecutor(max_workers=worker_count) as executor:
+                segments = executor.map(
+                    lambda args: _extract_segment(video_path, video_frames_dir, interval, *args),
+                    [(i, start, segment_length) for i, start in enumerate(segment_starts)]
+                )
+                return [frame for segment in segments for frame in segment]
+            
+        except Exception as e:
+            raise Exception(f"Error extracting frames: {str(e)}")
+
+    def _prepare_frames_dir(self, video_id: int) -> Path:
+        """
+        Create an empty output directory for a video's frames.
+        
+        Extraction only runs when the video has no frame rows, so anything
+        already in the directory (a crashed run, a reset database reusing the
+        id, the other extraction path's files) is stale and is removed.
+        """
+        video_frames_dir = self.frames_dir / str(video_id)
+        shutil.rmtree(video_frames_dir, ignore_errors=True)
+        video_frames_dir.mkdir()
+        return video_frames_dir
+
+    def _collect_frames(self, video_frames_dir: Path, interval: int) -> List[tuple]:
+        """Build (file_path, timestamp) pairs from the frame_%06d.jpg files written by FFmpeg."""
+        frame_paths = sorted(str(p) for p in video_frames_dir.glob("frame_" + "[0-9]" * 6 + ".jpg"))
+        timestamps = [float(i * interval) for i in range(len(frame_paths))]
+        return list(zip(frame_paths, timestamps))
+
     def save_frame_records(self, video_id: int, frame_data: List[tuple]) -> List[Frame]:
         """
         Save frame records to database.
@@ -123,21 +233,16 @@ class FrameExtractorService:
         Returns:
             List of created Frame objects
         """
-        frames = []
-        
-        for file_path, timestamp in frame_data:
-            frame = Frame(
-                video_id=video_id,
-                timestamp=timestamp,
-                path=file_path
-            )
-            self.db.add(frame)
-            frames.append(frame)
-        
+        mappings = [
+            {"video_id": video_id, "timestamp": timestamp, "path": file_path}
+            for file_path, timestamp in frame_data
+        ]
+        self.db.bulk_insert_mappings(Frame, mappings)
         self.db.commit()
-        return frames
+        
+        return self.db.query(Frame).filter(Frame.video_id == video_id).all()
 
-    def process_video_frames(self, video_id: int, video_url: str, interval: int = 10) -> List[Frame]:
+    def process_video_frames(self, video_id: int, video_url: str, interval: int = 10) -> Dict[str, Any]:
         """
         Complete frame extraction pipeline.
         
@@ -147,19 +252,25 @@ class FrameExtractorService:
             interval: Interval in seconds between frame extractions
             
         Returns:
-            List of created Frame objects
+            Dict with the number of frames for the video and whether they
+            already existed before this call
         """
-        temp_video_path = None
+        download_dir = None
         
         try:
             # Check if frames already exist for this video
-            existing_frames = self.db.query(Frame).filter(Frame.video_id == video_id).first()
-            if existing_frames:
+            frames_exist = self.db.query(
+                self.db.query(Frame).filter(Frame.video_id == video_id).exists()
+            ).scalar()
+            if frames_exist:
                 print(f"Frames already exist for video {video_id}")
-                return self.db.query(Frame).filter(Frame.video_id == video_id).all()
+                frame_count = self.db.query(func.count(Frame.id)).filter(Frame.video_id == video_id).scalar()
+                return {"frame_count": frame_count, "already_extracted": True}
             
-            # Download video to temporary location
-            temp_video_path = self.download_video(video_url, str(self.temp_dir))
+            # Download into a directory of its own, so the fallback file scan
+            # can't pick up (or clean up) another request's download
+            download_dir = tempfile.mkdtemp(prefix=f"video_{video_id}_", dir=self.temp_dir)
+            temp_video_path = self.download_video(video_url, download_dir)
             print(f"Downloaded video to: {temp_video_path}")
             
             # Extract frames
@@ -170,20 +281,25 @@ class FrameExtractorService:
             frames = self.save_frame_records(video_id, frame_data)
             print(f"Saved {len(frames)} frame records to database")
             
-            return frames
+            return {"frame_count": len(frames), "already_extracted": False}
             
         except Exception as e:
             raise Exception(f"Error processing video frames: {str(e)}")
         
         finally:
-            # Clean up temporary video file
-            if temp_video_path and os.path.exists(temp_video_path):
-                os.remove(temp_video_path)
-                print(f"Cleaned up temporary file: {temp_video_path}")
+            # Clean up the temporary download
+            if download_dir:
+                shutil.rmtree(download_dir, ignore_errors=True)
+                print(f"Cleaned up temporary directory: {download_dir}")
 
-    def get_frames_by_video_id(self, video_id: int) -> List[Frame]:
-        """Get all frames for a specific video."""
-        return self.db.query(Frame).filter(Frame.video_id == video_id).order_by(Frame.timestamp).all()
+    def get_frames_by_video_id(self, video_id: int) -> List[Dict[str, Any]]:
+        """Get all frames for a specific video as lightweight id/timestamp/path rows."""
+        rows = self.db.execute(
+            select(Frame.id, Frame.video_id, Frame.timestamp, Frame.path)
+            .where(Frame.video_id == video_id)
+            .order_by(Frame.timestamp)
+        ).mappings().all()
+        return [dict(row) for row in rows]
 
     def get_frame_by_timestamp(self, video_id: int, timestamp: float, tolerance: float = 5.0) -> Optional[Frame]:
         """
@@ -197,30 +313,24 @@ class FrameExtractorService:
         Returns:
             Frame object closest to the timestamp, or None if not found
         """
-        frames = self.db.query(Frame).filter(
+        # Let the (video_id, timestamp) index narrow the window and SQL pick the closest
+        return self.db.query(Frame).filter(
             Frame.video_id == video_id,
             Frame.timestamp >= timestamp - tolerance,
             Frame.timestamp <= timestamp + tolerance
-        ).order_by(Frame.timestamp).all()
-        
-        if not frames:
-            return None
-        
-        # Find the closest frame
-        closest_frame = min(frames, key=lambda f: abs(f.timestamp - timestamp))
-        return closest_frame
+        ).order_by(func.abs(Frame.timestamp - timestamp)).first()
 
     def cleanup_video_frames(self, video_id: int):
         """Remove all frames and files for a specific video."""
         try:
+            # Delete physical files
+            paths = self.db.query(Frame.path).filter(Frame.video_id == video_id).all()
+            for (path,) in paths:
+                if os.path.exists(path):
+                    os.remove(path)
+            
             # Delete database records
-            frames = self.db.query(Frame).filter(Frame.video_id == video_id).all()
-            for frame in frames:
-                # Delete physical file
-                if os.path.exists(frame.path):
-                    os.remove(frame.path)
-                # Delete database record
-                self.db.delete(frame)
+            self.db.query(Frame).filter(Frame.video_id == video_id).delete(synchronize_session=False)
             
             # Remove video frames directory if empty
             video_frames_dir = self.frames_dir / str(video_id)
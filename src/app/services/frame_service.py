@@ -21,11 +21,11 @@ class FrameService:
             return {"error": "Video not found", "extracted_count": 0}
         
         try:
-            frames = self.frame_extractor.process_video_frames(video_id, video.url, interval=10)
+            result = self.frame_extractor.process_video_frames(video_id, video.url, interval=10)
             return {
                 "message": "Frame extraction completed successfully",
                 "video_id": video_id,
-                "extracted_count": len(frames),
+                "extracted_count": result["frame_count"],
                 "status": "success"
             }
         except Exception as e:
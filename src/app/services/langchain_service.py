@@ -2,15 +2,20 @@
 LangChain-based video analysis service - simplified and more reliable.
 """
 
+import asyncio
 import os
 import re
-from pathlib import Path
+from bisect import bisect_right
+from functools import lru_cache
 from typing import List, Dict, Any, Optional
+import numpy as np
 from sqlalchemy.orm import Session
 
 from youtube_transcript_api import YouTubeTranscriptApi
-from langchain.text_splitter import RecursiveCharacterTextSplitter
+from langchain.text_splitter import TokenTextSplitter
 from langchain_openai import OpenAIEmbeddings, ChatOpenAI
+from langchain.embeddings import CacheBackedEmbeddings
+from langchain.storage import LocalFileStore
 from langchain_community.vectorstores import Chroma
 from langchain.chains import RetrievalQA
 from langchain.docstore.document import Document
@@ -18,35 +23,129 @@ from langchain.docstore.document import Document
 from ..models.video import Video
 from ..models.section import Section
 
+# All videos' transcript chunks share one collection, scoped by video_id metadata
+CHROMA_DIR = "storage/chroma"
+TRANSCRIPT_COLLECTION = "transcripts"
+
+_YT_ID_PATTERNS = [
+    re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)'),
+    re.compile(r'youtube\.com/.*[?&]v=([^&\n?#]+)')
+]
+
+# Chunks this similar to an earlier chunk are treated as repeats and not stored
+REDUNDANT_SIMILARITY_THRESHOLD = 0.95
+
+@lru_cache(maxsize=1)
+def _transcript_collection():
+    """The shared transcript collection, opened without any OpenAI clients."""
+    return Chroma(collection_name=TRANSCRIPT_COLLECTION, persist_directory=CHROMA_DIR)._collection
+
+def transcript_is_processed(video_id: int) -> bool:
+    """Whether any transcript chunks are stored for a video."""
+    stored = _transcript_collection().get(where={"video_id": video_id}, limit=1, include=[])
+    return bool(stored["ids"])
+
+def _no_transcript_result() -> Dict[str, Any]:
+    return {
+        "success": False,
+        "message": "No transcript available for this video",
+        "segments_count": 0,
+        "chunks_count": 0
+    }
+
+def _embedding_failed_result(segments: List[Dict[str, Any]], error: Exception) -> Dict[str, Any]:
+    return {
+        "success": False,
+        "message": f"Failed to create embeddings: {error}",
+        "segments_count": len(segments),
+        "chunks_count": 0
+    }
+
+def _processed_result(segments: List[Dict[str, Any]], chunk_docs: List[Document]) -> Dict[str, Any]:
+    return {
+        "success": True,
+        "message": "Transcript processed successfully",
+        "segments_count": len(segments),
+        "chunks_count": len(chunk_docs),
+        "vectorstore_path": CHROMA_DIR
+    }
+
+def _drop_redundant_chunks(chunk_docs: List[Document], vectors: List[List[float]]):
+    """
+    Drop chunks that are near-duplicates of an earlier chunk.
+    
+    A chunk is kept only if its cosine similarity to every chunk already kept
+    is at most REDUNDANT_SIMILARITY_THRESHOLD.
+    
+    Returns:
+        (kept documents, their vectors)
+    """
+    if not vectors:
+        return chunk_docs, vectors
+    
+    matrix = np.asarray(vectors, dtype=np.float32)
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    normalized = matrix / np.where(norms == 0, 1.0, norms)
+    
+    kept = np.empty_like(normalized)
+    kept_indices = []
+    for i, vector in enumerate(normalized):
+        if kept_indices and np.max(kept[:len(kept_indices)] @ vector) > REDUNDANT_SIMILARITY_THRESHOLD:
+            continue
+        kept[len(kept_indices)] = vector
+        kept_indices.append(i)
+    
+    return [chunk_docs[i] for i in kept_indices], [vectors[i] for i in kept_indices]
+
 class LangChainVideoService:
     """Simplified video analysis using LangChain."""
     
     def __init__(self, db: Session):
         self.db = db
         
-        # Initialize LangChain components
-        self.embeddings = OpenAIEmbeddings()
+        # Initialize LangChain components; pack up to 512 inputs per embeddings request
+        base_embeddings = OpenAIEmbeddings(
+            model="text-embedding-3-small",
+            chunk_size=512,
+            max_retries=5,
+            request_timeout=60
+        )
+        
+        # Cache document embeddings on disk so reprocessing a transcript
+        # doesn't re-embed chunks that were already seen
+        self.embeddings = CacheBackedEmbeddings.from_bytes_store(
+            base_embeddings,
+            LocalFileStore("storage/embed_cache"),
+            namespace=base_embeddings.model
+        )
+        self.vectorstore = Chroma(
+            collection_name=TRANSCRIPT_COLLECTION,
+            persist_directory=CHROMA_DIR,
+            embedding_function=self.embeddings
+        )
         self.llm = ChatOpenAI(
             model_name="gpt-4",
             temperature=0.1
         )
+        # Section titles are regenerated on demand, so they must bypass the LLM cache
+        self.section_llm = ChatOpenAI(
+            model_name="gpt-4",
+            temperature=0.1,
+            cache=False
+        )
         
-        # Text splitter for better chunking
-        self.text_splitter = RecursiveCharacterTextSplitter(
-            chunk_size=1000,
-            chunk_overlap=100,
-            separators=["\n\n", "\n", ".", "!", "?", ",", " ", ""]
+        # Token-based splitter: linear over the joined transcript and sized in
+        # the embedding model's own units
+        self.text_splitter = TokenTextSplitter(
+            encoding_name="cl100k_base",
+            chunk_size=400,
+            chunk_overlap=40
         )
     
     def extract_video_id(self, url: str) -> str:
         """Extract YouTube video ID from URL."""
-        patterns = [
-            r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)',
-            r'youtube\.com/.*[?&]v=([^&\n?#]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in _YT_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         
@@ -72,120 +171,124 @@ class LangChainVideoService:
             # Return empty list instead of dummy data
             return []
     
-    def process_transcript(self, video_id: int, video_url: str) -> Dict[str, Any]:
-        """Process transcript and create vector store."""
-        
-        # 1. Fetch transcript
-        segments = self.fetch_transcript(video_url)
-        
-        if not segments:
-            return {
-                "success": False,
-                "message": "No transcript available for this video",
-                "segments_count": 0,
-                "chunks_count": 0
-            }
-        
-        # 2. Create documents with metadata
-        documents = []
+    def _build_chunk_docs(self, video_id: int, segments: List[Dict[str, Any]]) -> List[Document]:
+        """Split transcript segments into documents tagged with their start times."""
+        # Join segments, remembering where each one starts in the text
         full_text_parts = []
+        segment_offsets = []
+        segment_starts = []
+        offset = 0
         
         for segment in segments:
             text = segment["text"].strip()
             if not text:
                 continue
-                
-            start_time = segment.get("start", 0)
-            duration = segment.get("duration", 0)
             
-            # Create document with rich metadata
-            doc = Document(
-                page_content=text,
-                metadata={
-                    "video_id": video_id,
-                    "start_time": start_time,
-                    "duration": duration,
-                    "timestamp": f"{int(start_time//60):02d}:{int(start_time%60):02d}",
-                    "source": "transcript"
-                }
-            )
-            documents.append(doc)
+            segment_offsets.append(offset)
+            segment_starts.append(segment.get("start", 0))
             full_text_parts.append(text)
+            offset += len(text) + 1  # joined with a single space
         
-        # 3. Split text for better retrieval
+        # Split text for better retrieval
         full_text = " ".join(full_text_parts)
         chunks = self.text_splitter.split_text(full_text)
         
-        # Create optimized documents from chunks
+        # Create optimized documents from chunks, each tagged with the real
+        # start time of the segment it begins in
         chunk_docs = []
+        cursor = 0
         for i, chunk in enumerate(chunks):
-            # Try to find approximate timestamp for this chunk
-            chunk_start = (i / len(chunks)) * segments[-1].get("start", 0) if segments else 0
+            position = full_text.find(chunk, cursor)
+            if position == -1:
+                position = cursor
+            cursor = position + 1
+            
+            segment_index = max(bisect_right(segment_offsets, position) - 1, 0)
+            chunk_start = segment_starts[segment_index] if segment_starts else 0
             
             chunk_docs.append(Document(
                 page_content=chunk,
                 metadata={
                     "video_id": video_id,
                     "chunk_id": i,
-                    "approximate_start_time": chunk_start,
+                    "start_time": chunk_start,
                     "timestamp": f"{int(chunk_start//60):02d}:{int(chunk_start%60):02d}",
                     "source": "transcript_chunk"
                 }
             ))
         
-        # 4. Create or update vector store
-        chroma_dir = Path(f"storage/chroma/video_{video_id}")
-        chroma_dir.mkdir(parents=True, exist_ok=True)
+        return chunk_docs
+    
+    def _store_chunks(self, video_id: int, chunk_docs: List[Document], vectors: List[List[float]]):
+        """Replace the video's chunks in the shared transcripts collection."""
+        collection = self.vectorstore._collection
+        
+        # Drop chunks from an earlier run so a shorter transcript leaves no stale tail
+        collection.delete(where={"video_id": video_id})
+        # Stable ids make reprocessing replace chunks instead of duplicating them
+        collection.upsert(
+            ids=[f"{video_id}-{i}" for i in range(len(chunk_docs))],
+            embeddings=vectors,
+            documents=[doc.page_content for doc in chunk_docs],
+            metadatas=[doc.metadata for doc in chunk_docs]
+        )
+        
+        print(f"✅ Stored {len(chunk_docs)} chunks for video {video_id}")
+    
+    def is_processed(self, video_id: int) -> bool:
+        """Whether any transcript chunks are stored for a video."""
+        return transcript_is_processed(video_id)
+    
+    def process_transcript(self, video_id: int, video_url: str) -> Dict[str, Any]:
+        """Process transcript and create vector store."""
         
+        # 1. Fetch transcript
+        segments = self.fetch_transcript(video_url)
+        
+        if not segments:
+            return _no_transcript_result()
+        
+        # 2. Split into timestamped chunks
+        chunk_docs = self._build_chunk_docs(video_id, segments)
+        
+        # 3. Create or update vector store
         try:
-            vectorstore = Chroma.from_documents(
-                documents=chunk_docs,
-                embedding=self.embeddings,
-                persist_directory=str(chroma_dir)
-            )
-            
-            print(f"✅ Created vector store with {len(chunk_docs)} chunks")
+            # Embed all chunks up front in as few batched requests as possible
+            vectors = self.embeddings.embed_documents([doc.page_content for doc in chunk_docs])
+            chunk_docs, vectors = _drop_redundant_chunks(chunk_docs, vectors)
+            self._store_chunks(video_id, chunk_docs, vectors)
             
         except Exception as e:
             print(f"❌ Failed to create vector store: {e}")
-            return {
-                "success": False,
-                "message": f"Failed to create embeddings: {e}",
-                "segments_count": len(segments),
-                "chunks_count": 0
-            }
+            return _embedding_failed_result(segments, e)
         
-        return {
-            "success": True,
-            "message": "Transcript processed successfully",
-            "segments_count": len(segments),
-            "chunks_count": len(chunk_docs),
-            "vectorstore_path": str(chroma_dir)
-        }
+        return _processed_result(segments, chunk_docs)
     
-    def get_qa_chain(self, video_id: int) -> Optional[RetrievalQA]:
-        """Get QA chain for a video."""
-        chroma_dir = Path(f"storage/chroma/video_{video_id}")
-        
-        if not chroma_dir.exists():
-            print(f"❌ No vector store found for video {video_id}")
-            return None
+    async def process_transcript_async(self, video_id: int, video_url: str) -> Dict[str, Any]:
+        """
+        Async variant of process_transcript that doesn't block the event loop.
         
+        Fetching, tokenizing, embedding, de-duplicating and storing all run on
+        a worker thread; the tokenizer pass and the redundancy check are CPU
+        bound and would otherwise stall every other request.
+        """
+        return await asyncio.to_thread(self.process_transcript, video_id, video_url)
+    
+    def get_qa_chain(self, video_id: int, llm: Optional[ChatOpenAI] = None) -> Optional[RetrievalQA]:
+        """Get QA chain for a video, answering with `llm` (defaults to the cached QA model)."""
         try:
-            # Load existing vector store
-            vectorstore = Chroma(
-                persist_directory=str(chroma_dir),
-                embedding_function=self.embeddings
-            )
+            if not self.is_processed(video_id):
+                print(f"❌ No transcript chunks found for video {video_id}")
+                return None
             
-            # Create retriever
-            retriever = vectorstore.as_retriever(
-                search_kwargs={"k": 3}
+            # Create retriever, scoped to this video's chunks in the shared collection
+            retriever = self.vectorstore.as_retriever(
+                search_kwargs={"k": 3, "filter": {"video_id": video_id}}
             )
             
             # Build QA chain
             qa_chain = RetrievalQA.from_chain_type(
-                llm=self.llm,
+                llm=llm or self.llm,
                 chain_type="stuff",
                 retriever=retriever,
                 return_source_documents=True
@@ -240,7 +343,7 @@ class LangChainVideoService:
     
     def generate_sections(self, video_id: int) -> List[Dict[str, Any]]:
         """Generate intelligent sections using LangChain."""
-        qa_chain = self.get_qa_chain(video_id)
+        qa_chain = self.get_qa_chain(video_id, llm=self.section_llm)
         
         if not qa_chain:
             # Create meaningful fallback sections when no transcript is available
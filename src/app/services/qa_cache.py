@@ -0,0 +1,44 @@
+"""
+In-memory cache for LangChain QA answers.
+
+Answers are keyed by video and normalized question so repeated questions
+skip the retrieval + LLM round trip.
+"""
+
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+from cachetools import TTLCache
+
+_cache: TTLCache = TTLCache(maxsize=2048, ttl=3600)
+_lock = threading.Lock()
+
+def _make_key(video_id: int, question: str) -> Tuple[int, str]:
+    """Build the cache key for a question about a video."""
+    return (video_id, question.strip().lower())
+
+def get_answer(video_id: int, question: str) -> Optional[Dict[str, Any]]:
+    """Return the cached QA result for a question, or None on a miss."""
+    with _lock:
+        return _cache.get(_make_key(video_id, question))
+
+def set_answer(video_id: int, question: str, result: Dict[str, Any]):
+    """Cache a QA result. Failed answers are not cached so they can be retried."""
+    if not result.get("success"):
+        return
+    with _lock:
+        _cache[_make_key(video_id, question)] = result
+
+def invalidate_video(video_id: int):
+    """Drop all cached answers for a video, e.g. after its transcript is reprocessed."""
+    with _lock:
+        for key in [k for k in _cache.keys() if k[0] == video_id]:
+            _cache.pop(key, None)
+
+def cached_ask_question(langchain_service, video_id: int, question: str) -> Dict[str, Any]:
+    """Answer a question through the cache, falling back to the QA chain on a miss."""
+    result = get_answer(video_id, question)
+    if result is None:
+        result = langchain_service.ask_question(video_id, question)
+        set_answer(video_id, question, result)
+    return result
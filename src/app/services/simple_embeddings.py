@@ -4,142 +4,414 @@ Stores embeddings locally without Qdrant dependency.
 """
 
 import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
 import numpy as np
-import pickle
 from pathlib import Path
+from typing import List, Optional
 from PIL import Image
 import open_clip
 import torch
+import torch.nn.functional as F
+from cachetools import LRUCache
 from sqlalchemy.orm import Session
 from ..models.frame import Frame
 from ..models.video import Video
 
+EMBEDDINGS_FILENAME = "embeddings.npy"
+SQ8_FILENAME = "embeddings_sq8.npy"
+META_FILENAME = "meta.npz"
+
+# CPU search scans int8 codes, then rescores this many candidates exactly
+RERANK_CANDIDATES = 40
+SQ8_SCAN_BLOCK = 4096
+
+# Recent query texts whose CLIP embeddings are kept in memory
+TEXT_EMBEDDING_CACHE_SIZE = 1024
+
+# Videos whose loaded embedding index (int8 codes or GPU matrix) stays in memory
+EMBEDDING_INDEX_CACHE_SIZE = 16
+
+# Threads decoding frame images ahead of the CLIP encoder
+IMAGE_LOADER_WORKERS = 4
+
+def _quantize_sq8(matrix: np.ndarray):
+    """Quantize embeddings to int8 codes with a per-dimension scale.
+    
+    Works through the matrix in blocks so a memory-mapped input is never
+    loaded whole.
+    """
+    scale = np.zeros(matrix.shape[1], dtype=np.float32)
+    for start in range(0, matrix.shape[0], SQ8_SCAN_BLOCK):
+        block = np.asarray(matrix[start:start + SQ8_SCAN_BLOCK], dtype=np.float32)
+        np.maximum(scale, np.max(np.abs(block), axis=0), out=scale)
+    scale /= 127.0
+    scale[scale == 0] = 1.0
+    
+    codes = np.empty(matrix.shape, dtype=np.int8)
+    for start in range(0, matrix.shape[0], SQ8_SCAN_BLOCK):
+        block = np.asarray(matrix[start:start + SQ8_SCAN_BLOCK], dtype=np.float32)
+        codes[start:start + SQ8_SCAN_BLOCK] = np.round(block / scale)
+    return codes, scale
+
+def _embeddings_dir(video_id: int) -> Path:
+    """Directory holding a video's frame embedding matrix and metadata."""
+    return Path(f"storage/embeddings/video_{video_id}")
+
+# CLIP weights are loaded once per process and shared by every service instance
+_CLIP_STATE = {"model": None, "preprocess": None, "tokenizer": None, "lock": threading.Lock()}
+
 class SimpleEmbeddingService:
-    """Simple embedding service using CLIP without external vector databases."""
+    """
+    Simple embedding service using CLIP without external vector databases.
+    
+    One instance is shared for the app's lifetime and the CLIP model is a
+    process-wide singleton; the database session is passed per call.
+    """
     
-    def __init__(self, db: Session):
-        self.db = db
+    def __init__(self):
         self.device = "cuda" if torch.cuda.is_available() else "cpu"
         self.model = None
         self.preprocess = None
         self.tokenizer = None
         
+        # query text -> normalized CLIP text embedding
+        self._text_cache = LRUCache(maxsize=TEXT_EMBEDDING_CACHE_SIZE)
+        self._text_cache_lock = threading.Lock()
+        
+        # video_id -> (file mtime, loaded embedding index)
+        self._matrix_cache = LRUCache(maxsize=EMBEDDING_INDEX_CACHE_SIZE)
+        self._matrix_lock = threading.Lock()
+        
     def _load_clip_model(self):
         """Load CLIP model if not already loaded."""
-        if self.model is None:
-            print("Loading CLIP model...")
-            self.model, _, self.preprocess = open_clip.create_model_and_transforms(
-                'ViT-B-32', 
-                pretrained='openai'
+        if self.model is not None:
+            return
+        if _CLIP_STATE["model"] is None:
+            with _CLIP_STATE["lock"]:
+                if _CLIP_STATE["model"] is None:
+                    print("Loading CLIP model...")
+                    model, _, preprocess = open_clip.create_model_and_transforms(
+                        'ViT-B-32', 
+                        pretrained='openai'
+                    )
+                    model.to(self.device)
+                    model.eval()
+                    if self.device == "cuda":
+                        model.half()
+                    _CLIP_STATE["preprocess"] = preprocess
+                    _CLIP_STATE["tokenizer"] = open_clip.get_tokenizer('ViT-B-32')
+                    _CLIP_STATE["model"] = model
+                    print("CLIP model loaded successfully")
+        
+        self.preprocess = _CLIP_STATE["preprocess"]
+        self.tokenizer = _CLIP_STATE["tokenizer"]
+        self.model = _CLIP_STATE["model"]
+    
+    def _autocast(self):
+        """FP16 autocast on CUDA; a no-op on CPU where FP16 matmuls are slow."""
+        if self.device == "cuda":
+            return torch.autocast(device_type="cuda", dtype=torch.float16)
+        return nullcontext()
+    
+    def _load_frame_image(self, frame_row):
+        """Load and preprocess one frame image; returns None if it can't be read."""
+        frame_id, timestamp, path = frame_row
+        try:
+            if not os.path.exists(path):
+                print(f"Frame image not found: {path}")
+                return None
+            
+            image = Image.open(path).convert('RGB')
+            return (frame_id, timestamp, self.preprocess(image))
+            
+        except Exception as e:
+            print(f"Error processing frame {frame_id}: {str(e)}")
+            return None
+    
+    def _iter_preprocessed_batches(self, frame_rows, batch_size: int, executor):
+        """Yield preprocessed batches, keeping one batch of image loads in flight ahead."""
+        batches = [frame_rows[i:i + batch_size] for i in range(0, len(frame_rows), batch_size)]
+        
+        pending = [executor.submit(self._load_frame_image, row) for row in batches[0]] if batches else []
+        for i in range(len(batches)):
+            current = pending
+            pending = (
+                [executor.submit(self._load_frame_image, row) for row in batches[i + 1]]
+                if i + 1 < len(batches) else []
             )
-            self.tokenizer = open_clip.get_tokenizer('ViT-B-32')
-            self.model.to(self.device)
-            self.model.eval()
-            print("CLIP model loaded successfully")
+            loaded = [future.result() for future in current]
+            yield [item for item in loaded if item is not None]
     
-    def generate_frame_embeddings(self, video_id: int):
-        """Generate CLIP embeddings for all frames of a video."""
+    def generate_frame_embeddings(self, db: Session, video_id: int, batch_size: int = 64):
+        """Generate CLIP embeddings for all frames of a video, encoding in batches."""
         try:
             self._load_clip_model()
             
             # Get all frames for the video
-            frames = self.db.query(Frame).filter(Frame.video_id == video_id).all()
+            frames = db.query(Frame).filter(Frame.video_id == video_id).all()
             if not frames:
                 return {"error": "No frames found", "processed": 0}
             
-            embeddings = []
-            processed_count = 0
+            frame_ids = []
+            timestamps = []
             
             # Create embeddings directory
-            embeddings_dir = Path(f"storage/embeddings/video_{video_id}")
+            embeddings_dir = _embeddings_dir(video_id)
             embeddings_dir.mkdir(parents=True, exist_ok=True)
             
-            for frame in frames:
-                try:
-                    # Load frame image
-                    if not os.path.exists(frame.path):
-                        print(f"Frame image not found: {frame.path}")
+            # Rows are written straight into a preallocated memory-mapped
+            # matrix as each batch finishes; it's renamed into place once
+            # complete so readers never see a partial file
+            partial_file = embeddings_dir / "embeddings.partial.npy"
+            matrix = None
+            
+            # Decode the next batch of images on worker threads while the
+            # current batch is being encoded
+            frame_rows = [(frame.id, frame.timestamp, frame.path) for frame in frames]
+            with ThreadPoolExecutor(max_workers=IMAGE_LOADER_WORKERS) as executor:
+                for batch in self._iter_preprocessed_batches(frame_rows, batch_size, executor):
+                    if not batch:
                         continue
                     
-                    image = Image.open(frame.path).convert('RGB')
-                    image_tensor = self.preprocess(image).unsqueeze(0).to(self.device)
+                    image_batch = torch.stack([tensor for _, _, tensor in batch]).to(
+                        self.device, dtype=next(self.model.parameters()).dtype, non_blocking=True
+                    )
                     
-                    # Generate embedding
-                    with torch.no_grad():
-                        embedding = self.model.encode_image(image_tensor)
-                        embedding = embedding / embedding.norm(dim=-1, keepdim=True)  # Normalize
+                    with torch.inference_mode(), self._autocast():
+                        batch_embeddings = self.model.encode_image(image_batch)
+                        batch_embeddings = F.normalize(batch_embeddings, dim=-1)
                     
-                    embeddings.append({
-                        'frame_id': frame.id,
-                        'timestamp': frame.timestamp,
-                        'embedding': embedding.cpu().numpy()
-                    })
-                    processed_count += 1
+                    if matrix is None:
+                        matrix = np.lib.format.open_memmap(
+                            partial_file, mode='w+', dtype=np.float16,
+                            shape=(len(frames), batch_embeddings.shape[1])
+                        )
                     
-                except Exception as e:
-                    print(f"Error processing frame {frame.id}: {str(e)}")
-                    continue
-            
-            # Save embeddings to file
-            if embeddings:
-                embeddings_file = embeddings_dir / "frame_embeddings.pkl"
-                with open(embeddings_file, 'wb') as f:
-                    pickle.dump(embeddings, f)
+                    row = len(frame_ids)
+                    matrix[row:row + len(batch)] = batch_embeddings.half().cpu().numpy()
+                    frame_ids.extend(frame_id for frame_id, _, _ in batch)
+                    timestamps.extend(timestamp for _, timestamp, _ in batch)
+            
+            processed_count = len(frame_ids)
+            
+            # Frame metadata, int8 codes and the matrix are all written under
+            # temporary names and renamed into place, the matrix last since
+            # readers key off it
+            embeddings_file = None
+            if processed_count:
+                if processed_count < len(frames):
+                    # Some frames were skipped; drop the unused tail rows
+                    trimmed_file = embeddings_dir / "embeddings.trimmed.npy"
+                    np.save(trimmed_file, matrix[:processed_count])
+                    del matrix
+                    os.replace(trimmed_file, partial_file)
+                else:
+                    matrix.flush()
+                    del matrix
+                
+                matrix = np.load(partial_file, mmap_mode='r')
+                codes, scale = _quantize_sq8(matrix)
+                del matrix
                 
-                print(f"Saved {len(embeddings)} embeddings to {embeddings_file}")
+                meta_partial = embeddings_dir / "meta.partial.npz"
+                sq8_partial = embeddings_dir / "embeddings_sq8.partial.npy"
+                np.savez(meta_partial,
+                         frame_ids=np.array(frame_ids), timestamps=np.array(timestamps),
+                         sq8_scale=scale.astype(np.float16))
+                np.save(sq8_partial, codes)
+                
+                os.replace(meta_partial, embeddings_dir / META_FILENAME)
+                os.replace(sq8_partial, embeddings_dir / SQ8_FILENAME)
+                embeddings_file = embeddings_dir / EMBEDDINGS_FILENAME
+                os.replace(partial_file, embeddings_file)
+                
+                print(f"Saved {processed_count} embeddings to {embeddings_file}")
             
             return {
                 "success": True,
                 "processed": processed_count,
                 "total_frames": len(frames),
-                "embeddings_file": str(embeddings_file) if embeddings else None
+                "embeddings_file": str(embeddings_file) if embeddings_file else None
             }
             
         except Exception as e:
             print(f"Error generating embeddings: {str(e)}")
             return {"error": str(e), "processed": 0}
     
-    def search_visual_content(self, video_id: int, query: str, limit: int = 10):
-        """Search frames using text query against visual embeddings."""
+    def get_cached_text_embedding(self, query: str) -> Optional[np.ndarray]:
+        """Return a query's cached text embedding, or None if it isn't cached."""
+        with self._text_cache_lock:
+            return self._text_cache.get(query)
+    
+    def encode_text_batch(self, queries: List[str]) -> np.ndarray:
+        """Encode several text queries in one CLIP forward pass.
+        
+        Embeddings of recently seen queries are served from an LRU cache;
+        only the rest go through the model.
+        
+        Returns:
+            Normalized embeddings, one row per query
+        """
+        with self._text_cache_lock:
+            cached = {query: self._text_cache[query] for query in queries if query in self._text_cache}
+        
+        missing = list(dict.fromkeys(query for query in queries if query not in cached))
+        if missing:
+            self._load_clip_model()
+            
+            text_tokens = self.tokenizer(missing).to(self.device)
+            with torch.inference_mode(), self._autocast():
+                text_embedding = self.model.encode_text(text_tokens)
+                text_embedding = F.normalize(text_embedding, dim=-1)
+            
+            encoded = text_embedding.float().cpu().numpy()
+            encoded.setflags(write=False)
+            with self._text_cache_lock:
+                for query, embedding in zip(missing, encoded):
+                    self._text_cache[query] = embedding
+                    cached[query] = embedding
+        
+        return np.stack([cached[query] for query in queries])
+    
+    def _load_embedding_index(self, video_id: int):
+        """
+        Load a video's frame embeddings for search.
+        
+        On CUDA the float16 matrix is moved to the GPU whole. On CPU only the
+        int8 codes are held in memory; the float16 matrix stays memory-mapped
+        and is read just for reranking candidates.
+        
+        The result is cached per video and reloaded when the embeddings file
+        changes.
+        
+        Returns:
+            Dict with frame_ids, timestamps and either "matrix" (CUDA) or
+            "codes"/"scale"/"full" (CPU), or None if no embeddings exist
+        """
+        embeddings_dir = _embeddings_dir(video_id)
+        embeddings_file = embeddings_dir / EMBEDDINGS_FILENAME
+        if not embeddings_file.exists():
+            return None
+        
+        mtime = embeddings_file.stat().st_mtime
+        with self._matrix_lock:
+            cached = self._matrix_cache.get(video_id)
+            if cached and cached[0] == mtime:
+                return cached[1]
+        
+        # Memory-map so only the pages actually read are touched
+        stored = np.load(embeddings_file, mmap_mode='r')
+        if stored.shape[0] == 0:
+            return None
+        
+        with np.load(embeddings_dir / META_FILENAME) as meta:
+            index = {
+                "frame_ids": meta['frame_ids'],
+                "timestamps": meta['timestamps'],
+            }
+            scale = meta['sq8_scale'].astype(np.float32)
+        
+        if self.device == "cuda":
+            index["matrix"] = torch.from_numpy(np.ascontiguousarray(stored)).to(
+                self.device, dtype=torch.float16
+            )
+        else:
+            index["codes"] = np.load(embeddings_dir / SQ8_FILENAME)
+            index["scale"] = scale
+            index["full"] = stored
+        
+        # A load that lands between the renames pairs files from two runs;
+        # keep serving the previous index rather than mismatched rows
+        rows = stored.shape[0]
+        if len(index["frame_ids"]) != rows or len(index.get("codes", stored)) != rows:
+            return cached[1] if cached else None
+        
+        with self._matrix_lock:
+            self._matrix_cache[video_id] = (mtime, index)
+        return index
+    
+    def _score_frames(self, index, text_embedding: np.ndarray, limit: int):
+        """
+        Score frames against a normalized query embedding.
+        
+        Returns:
+            (frame indices, similarities) for the frames that were scored exactly
+        """
+        if "matrix" in index:
+            # Embeddings are normalized, so cosine similarity is one matrix-vector product
+            query = torch.from_numpy(text_embedding).to(self.device, dtype=index["matrix"].dtype)
+            sims = (index["matrix"] @ query).float().cpu().numpy()
+            return np.arange(len(sims)), sims
+        
+        # Asymmetric int8 scan: dot the codes with a pre-scaled float query,
+        # a block at a time to bound the temporary float copy
+        codes = index["codes"]
+        query = text_embedding.astype(np.float32)
+        scaled_query = query * index["scale"]
+        approx = np.empty(len(codes), dtype=np.float32)
+        for start in range(0, len(codes), SQ8_SCAN_BLOCK):
+            block = codes[start:start + SQ8_SCAN_BLOCK]
+            approx[start:start + len(block)] = block.astype(np.float32) @ scaled_query
+        
+        # Rerank the best candidates with the full-precision vectors
+        rerank_k = min(len(approx), max(limit, RERANK_CANDIDATES))
+        candidates = np.sort(np.argpartition(-approx, rerank_k - 1)[:rerank_k])
+        sims = np.asarray(index["full"][candidates], dtype=np.float32) @ query
+        return candidates, sims
+    
+    def search_visual_content(self, db: Session, video_id: int, query: str, limit: int = 10,
+                              text_embedding: Optional[np.ndarray] = None):
+        """
+        Search frames using text query against visual embeddings.
+        
+        Args:
+            db: Database session
+            video_id: Database ID of the video
+            query: Text query
+            limit: Maximum number of results
+            text_embedding: Precomputed normalized query embedding; the query
+                is encoded here when omitted
+        """
         try:
             self._load_clip_model()
             
             # Load embeddings
-            embeddings_file = Path(f"storage/embeddings/video_{video_id}/frame_embeddings.pkl")
-            if not embeddings_file.exists():
+            index = self._load_embedding_index(video_id)
+            if index is None or limit <= 0:
                 return []
+            frame_ids = index["frame_ids"]
+            timestamps = index["timestamps"]
             
-            with open(embeddings_file, 'rb') as f:
-                embeddings_data = pickle.load(f)
+            # Generate query embedding
+            if text_embedding is None:
+                text_embedding = self.encode_text_batch([query])[0]
             
-            if not embeddings_data:
-                return []
+            candidates, sims = self._score_frames(index, text_embedding, limit)
+            
+            # Select the top results without sorting every frame
+            k = min(limit, len(sims))
+            top = np.argpartition(-sims, k - 1)[:k]
+            top = top[np.argsort(-sims[top])]
+            
+            results = [
+                {
+                    'frame_id': int(frame_ids[candidates[i]]),
+                    'timestamp': float(timestamps[candidates[i]]),
+                    'similarity': float(sims[i])
+                }
+                for i in top
+            ]
+            
+            # Get frame details from database in one query, keeping similarity order
+            ids = [result['frame_id'] for result in results]
+            rows = db.query(Frame).filter(Frame.id.in_(ids)).all()
+            frames_by_id = {frame.id: frame for frame in rows}
             
-            # Generate query embedding
-            text_tokens = self.tokenizer([query]).to(self.device)
-            with torch.no_grad():
-                text_embedding = self.model.encode_text(text_tokens)
-                text_embedding = text_embedding / text_embedding.norm(dim=-1, keepdim=True)
-            
-            # Calculate similarities
-            similarities = []
-            for item in embeddings_data:
-                frame_embedding = torch.from_numpy(item['embedding']).to(self.device)
-                similarity = torch.cosine_similarity(text_embedding, frame_embedding).item()
-                similarities.append({
-                    'frame_id': item['frame_id'],
-                    'timestamp': item['timestamp'],
-                    'similarity': similarity
-                })
-            
-            # Sort by similarity and return top results
-            similarities.sort(key=lambda x: x['similarity'], reverse=True)
-            results = similarities[:limit]
-            
-            # Get frame details from database
             detailed_results = []
             for result in results:
-                frame = self.db.query(Frame).filter(Frame.id == result['frame_id']).first()
+                frame = frames_by_id.get(result['frame_id'])
                 if frame:
                     detailed_results.append({
                         'frame_id': frame.id,
@@ -156,7 +428,7 @@ class SimpleEmbeddingService:
     
     def get_embeddings_status(self, video_id: int):
         """Check if embeddings exist for a video."""
-        embeddings_file = Path(f"storage/embeddings/video_{video_id}/frame_embeddings.pkl")
+        embeddings_file = _embeddings_dir(video_id) / EMBEDDINGS_FILENAME
         return {
             "video_id": video_id,
             "embeddings_exist": embeddings_file.exists(),
@@ -0,0 +1,76 @@
+"""
+Micro-batching for CLIP text queries.
+
+Concurrent visual searches wait a few milliseconds so their queries can be
+encoded together in a single CLIP forward pass.
+"""
+
+import asyncio
+from typing import List, Tuple
+
+import numpy as np
+
+from .simple_embeddings import SimpleEmbeddingService
+
+class TextEmbeddingBatcher:
+    """Coalesces concurrent text-embedding requests into batched CLIP calls."""
+    
+    def __init__(self, embedding_service: SimpleEmbeddingService,
+                 max_batch_size: int = 32, max_wait: float = 0.01):
+        self.embedding_service = embedding_service
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self._pending: List[Tuple[str, asyncio.Future]] = []
+        self._lock = asyncio.Lock()
+        self._batch_full = asyncio.Event()
+        self._worker = None
+    
+    async def embed(self, query: str) -> np.ndarray:
+        """Return the normalized CLIP embedding for a query."""
+        # Repeated queries skip the batching delay entirely
+        cached = self.embedding_service.get_cached_text_embedding(query)
+        if cached is not None:
+            return cached
+        
+        future = asyncio.get_running_loop().create_future()
+        
+        async with self._lock:
+            self._pending.append((query, future))
+            if len(self._pending) >= self.max_batch_size:
+                self._batch_full.set()
+            if self._worker is None or self._worker.done():
+                self._worker = asyncio.create_task(self._run())
+        
+        return await future
+    
+    async def _run(self):
+        """Drain pending queries every max_wait seconds or once a batch fills up."""
+        while True:
+            try:
+                await asyncio.wait_for(self._batch_full.wait(), timeout=self.max_wait)
+            except asyncio.TimeoutError:
+                pass
+            
+            async with self._lock:
+                batch = self._pending[:self.max_batch_size]
+                self._pending = self._pending[self.max_batch_size:]
+                if len(self._pending) < self.max_batch_size:
+                    self._batch_full.clear()
+                if not batch:
+                    # Nothing left to do; the next embed() call restarts the worker
+                    self._worker = None
+                    return
+            
+            try:
+                embeddings = await asyncio.to_thread(
+                    self.embedding_service.encode_text_batch, [query for query, _ in batch]
+                )
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+            
+            for (_, future), embedding in zip(batch, embeddings):
+                if not future.done():
+                    future.set_result(embedding)
@@ -6,6 +6,12 @@ import re
 from sqlalchemy.orm import Session
 from ..models.video import Video
 
+# YouTube video ID patterns, compiled once at import
+_YT_ID_PATTERNS = [
+    re.compile(r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)'),
+    re.compile(r'youtube\.com/.*[?&]v=([^&\n?#]+)')
+]
+
 class VideoService:
     """Simple service for video management."""
     
@@ -14,13 +20,8 @@ class VideoService:
     
     def extract_video_id(self, url: str) -> str:
         """Extract YouTube video ID from URL."""
-        patterns = [
-            r'(?:youtube\.com/watch\?v=|youtu\.be/|youtube\.com/embed/)([^&\n?#]+)',
-            r'youtube\.com/.*[?&]v=([^&\n?#]+)'
-        ]
-        
-        for pattern in patterns:
-            match = re.search(pattern, url)
+        for pattern in _YT_ID_PATTERNS:
+            match = pattern.search(url)
             if match:
                 return match.group(1)
         
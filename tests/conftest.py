@@ -1,17 +1,27 @@
 import pytest
 import asyncio
+import os
+from dataclasses import asdict, dataclass
 from typing import Generator, AsyncGenerator
 from httpx import AsyncClient
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
+from sqlalchemy import create_engine, event, insert
+from sqlalchemy.orm import Session
+from sqlalchemy.pool import StaticPool
 from fastapi.testclient import TestClient
+from PIL import Image
 
 from src.app.main import app
+from src.app.api.routes import get_embedding_service, get_text_embedding_batcher
 from src.app.db.database import Base, get_db
-from src.app.db.models import Video, Section, Frame
+from src.app.models.video import Video
+from src.app.models.section import Section
+from src.app.models.frame import Frame
+from src.app.services.simple_embeddings import SimpleEmbeddingService
+from src.app.services.text_embedding_batcher import TextEmbeddingBatcher
 
-# Test database configuration
-TEST_DATABASE_URL = "sqlite:///./test.db"
+# Test database configuration: one in-memory database shared by every
+# connection for the whole session
+TEST_DATABASE_URL = "sqlite:///:memory:"
 
 @pytest.fixture(scope="session")
 def event_loop():
@@ -20,36 +30,91 @@ def event_loop():
     yield loop
     loop.close()
 
-@pytest.fixture(scope="function")
+@pytest.fixture(scope="session")
 def test_engine():
-    """Create a test database engine."""
-    engine = create_engine(TEST_DATABASE_URL, connect_args={"check_same_thread": False})
+    """Create the test database engine and schema once per session."""
+    engine = create_engine(
+        TEST_DATABASE_URL,
+        connect_args={"check_same_thread": False},
+        poolclass=StaticPool
+    )
+    
+    # pysqlite's own transaction handling breaks SAVEPOINT; let SQLAlchemy
+    # emit BEGIN itself
+    @event.listens_for(engine, "connect")
+    def _disable_pysqlite_begin(dbapi_connection, connection_record):
+        dbapi_connection.isolation_level = None
+    
+    @event.listens_for(engine, "begin")
+    def _emit_begin(conn):
+        conn.exec_driver_sql("BEGIN")
+    
     Base.metadata.create_all(bind=engine)
     yield engine
     Base.metadata.drop_all(bind=engine)
+    engine.dispose()
 
 @pytest.fixture(scope="function")
 def test_db_session(test_engine):
-    """Create a test database session."""
-    TestingSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=test_engine)
-    session = TestingSessionLocal()
+    """Create a test database session rolled back after each test.
+    
+    The session joins an outer transaction through a SAVEPOINT, so commits
+    made by fixtures and endpoints are discarded at teardown without
+    rebuilding the schema.
+    """
+    connection = test_engine.connect()
+    transaction = connection.begin()
+    session = Session(
+        bind=connection,
+        autoflush=False,
+        join_transaction_mode="create_savepoint"
+    )
     try:
         yield session
     finally:
         session.close()
+        transaction.rollback()
+        connection.close()
+
+@pytest.fixture(scope="session", autouse=True)
+def storage_workdir(tmp_path_factory):
+    """Run the suite from a scratch directory.
+    
+    Services write under relative storage/ paths (frames, embeddings,
+    Chroma), so this keeps them out of the repository.
+    """
+    previous = os.getcwd()
+    os.chdir(tmp_path_factory.mktemp("workdir"))
+    yield
+    os.chdir(previous)
+
+@pytest.fixture(scope="module")
+def shared_test_client():
+    """One TestClient reused by every test in a module.
+    
+    The client isn't entered, so the app lifespan (database init, LLM cache,
+    CLIP service) doesn't run; test_client overrides what the routes need.
+    """
+    client = TestClient(app, raise_server_exceptions=False)
+    yield client
+    client.close()
 
 @pytest.fixture(scope="function")
-def test_client(test_db_session):
-    """Create a test client with database override."""
+def test_client(shared_test_client, test_db_session):
+    """Shared test client with this test's database session and embedding services swapped in."""
     def override_get_db():
         try:
             yield test_db_session
         finally:
             pass
     
+    embedding_service = SimpleEmbeddingService()
+    text_embedding_batcher = TextEmbeddingBatcher(embedding_service)
+    
     app.dependency_overrides[get_db] = override_get_db
-    client = TestClient(app)
-    yield client
+    app.dependency_overrides[get_embedding_service] = lambda: embedding_service
+    app.dependency_overrides[get_text_embedding_batcher] = lambda: text_embedding_batcher
+    yield shared_test_client
     app.dependency_overrides.clear()
 
 @pytest.fixture(scope="function")
@@ -68,50 +133,74 @@ async def async_client(test_db_session):
     
     app.dependency_overrides.clear()
 
+@dataclass(frozen=True, slots=True)
+class SampleVideo:
+    id: int
+    url: str
+    title: str
+
+@dataclass(frozen=True, slots=True)
+class SampleSection:
+    id: int
+    video_id: int
+    title: str
+    start_time: float
+    end_time: float
+
+@dataclass(frozen=True, slots=True)
+class SampleFrame:
+    id: int
+    video_id: int
+    timestamp: float
+    path: str
+
+@pytest.fixture(scope="session")
+def sample_video_data():
+    """Sample video row, built once per session."""
+    return SampleVideo(id=1, url="https://www.youtube.com/watch?v=test123", title="Test Video")
+
+@pytest.fixture(scope="session")
+def sample_section_data(sample_video_data):
+    """Sample section row, built once per session."""
+    return SampleSection(id=1, video_id=sample_video_data.id, title="Introduction",
+                         start_time=0.0, end_time=120.5)
+
+@pytest.fixture(scope="session")
+def sample_frame_data(sample_video_data):
+    """Sample frame row, built once per session."""
+    return SampleFrame(id=1, video_id=sample_video_data.id, timestamp=60.0,
+                       path="/test/path/frame_60.jpg")
+
 @pytest.fixture
-def sample_video(test_db_session):
-    """Create a sample video for testing."""
-    video = Video(
-        url="https://www.youtube.com/watch?v=test123",
-        title="Test Video",
-        created_at=None,
-        updated_at=None
-    )
-    test_db_session.add(video)
-    test_db_session.commit()
-    test_db_session.refresh(video)
-    return video
+def sample_video(test_db_session, sample_video_data):
+    """Insert the sample video for this test; rolled back afterwards."""
+    test_db_session.execute(insert(Video).values(**asdict(sample_video_data)))
+    return sample_video_data
 
 @pytest.fixture
-def sample_section(test_db_session, sample_video):
-    """Create a sample section for testing."""
-    section = Section(
-        video_id=sample_video.id,
-        title="Introduction",
-        start_time=0.0,
-        end_time=120.5,
-        created_at=None,
-        updated_at=None
-    )
-    test_db_session.add(section)
-    test_db_session.commit()
-    test_db_session.refresh(section)
-    return section
+def sample_section(test_db_session, sample_video, sample_section_data):
+    """Insert the sample section for this test; rolled back afterwards."""
+    test_db_session.execute(insert(Section).values(**asdict(sample_section_data)))
+    return sample_section_data
 
 @pytest.fixture
-def sample_frame(test_db_session, sample_video):
-    """Create a sample frame for testing."""
-    frame = Frame(
-        video_id=sample_video.id,
-        timestamp=60.0,
-        path="/test/path/frame_60.jpg",
-        created_at=None,
-        updated_at=None
-    )
-    test_db_session.add(frame)
-    test_db_session.commit()
-    test_db_session.refresh(frame)
-    return frame
+def sample_frame(test_db_session, sample_video, sample_frame_data):
+    """Insert the sample frame for this test; rolled back afterwards."""
+    test_db_session.execute(insert(Frame).values(**asdict(sample_frame_data)))
+    return sample_frame_data
+
+@pytest.fixture
+def sample_frame_images(test_db_session, sample_video, tmp_path):
+    """Insert three frames backed by real JPEG files; rolled back afterwards."""
+    frames = []
+    for i, timestamp in enumerate((0.0, 10.0, 20.0)):
+        path = tmp_path / f"frame_{i:04d}.jpg"
+        Image.new("RGB", (640, 360), color=(40 * i, 80, 120)).save(path, format="JPEG")
+        frames.append(SampleFrame(id=10 + i, video_id=sample_video.id, timestamp=timestamp,
+                                  path=str(path)))
+    
+    test_db_session.execute(insert(Frame).values([asdict(frame) for frame in frames]))
+    return frames
 
 @pytest.fixture
 def mock_youtube_url():
@@ -1,8 +1,41 @@
 import pytest
-from unittest.mock import patch, Mock
+import asyncio
+import base64
+import io
+import time
+import numpy as np
+from cachetools import TTLCache
 from fastapi.testclient import TestClient
+from PIL import Image
+from sqlalchemy import insert
 import json
 
+from src.app.api import routes
+from src.app.models.frame import Frame
+
+# LangChainVideoService.ask_question result
+_CHAT_MOCK_RESPONSE = {
+    "success": True,
+    "answer": "This is a test response",
+    "sources": [{"content": "test", "timestamp": "01:00", "start_time": 60.0}]
+}
+
+_NO_TRANSCRIPT_RESULT = {
+    "success": False,
+    "message": "No transcript available for this video",
+    "segments_count": 0,
+    "chunks_count": 0
+}
+
+
+def _sse_events(body: str):
+    """Split a Server-Sent Events body into (event, data) pairs."""
+    events = []
+    for block in body.strip().split("\n\n"):
+        fields = dict(line.split(": ", 1) for line in block.split("\n"))
+        events.append((fields["event"], json.loads(fields["data"])))
+    return events
+
 
 class TestAPIEndpoints:
     """Integration tests for API endpoints."""
@@ -28,34 +61,38 @@ class TestAPIEndpoints:
         response = test_client.post("/api/upload", data={"url": "test"})
         assert response.status_code == 422
 
-    @patch('src.app.services.youtube.YouTubeService.process_video')
-    def test_upload_endpoint_success(self, mock_process_video, test_client, sample_video):
+    def test_upload_endpoint_success(self, mocker, test_client, sample_video):
         """Test successful video upload."""
-        mock_process_video.return_value = sample_video
+        mock_langchain = mocker.patch('src.app.api.routes.LangChainVideoService', autospec=True)
+        mock_langchain.return_value.process_transcript.return_value = _NO_TRANSCRIPT_RESULT
         
         response = test_client.post(
             "/api/upload",
-            json={"url": "https://www.youtube.com/watch?v=test123"}
+            json={"url": sample_video.url}
         )
         
         assert response.status_code == 200
         data = response.json()
-        assert data["message"] == "Video processed successfully"
+        assert data["message"] == "Video uploaded and processed"
         assert data["video_id"] == sample_video.id
-        assert data["title"] == sample_video.title
+        assert data["url"] == sample_video.url
+        assert data["transcript"]["success"] is False
 
-    @patch('src.app.services.youtube.YouTubeService.process_video')
-    def test_upload_endpoint_processing_error(self, mock_process_video, test_client):
+    def test_upload_endpoint_processing_error(self, mocker, test_client):
         """Test upload endpoint with processing error."""
-        mock_process_video.side_effect = Exception("Processing failed")
+        mocker.patch('src.app.api.routes.LangChainVideoService', autospec=True)
+        mocker.patch(
+            'src.app.services.video_service.VideoService.create_video',
+            side_effect=Exception("Processing failed")
+        )
         
         response = test_client.post(
             "/api/upload",
             json={"url": "https://www.youtube.com/watch?v=test123"}
         )
         
-        assert response.status_code == 500
-        assert "Error processing video" in response.json()["detail"]
+        assert response.status_code == 400
+        assert "Processing failed" in response.json()["detail"]
 
     def test_sections_endpoint_with_data(self, test_client, sample_section):
         """Test sections endpoint with existing data."""
@@ -70,40 +107,29 @@ class TestAPIEndpoints:
     def test_sections_endpoint_no_data(self, test_client):
         """Test sections endpoint with no data."""
         response = test_client.get("/api/sections/999")
-        assert response.status_code == 500
-        assert "No sections found" in response.json()["detail"]
+        assert response.status_code == 404
+        assert "Video not found" in response.json()["detail"]
 
     def test_sections_endpoint_invalid_id(self, test_client):
         """Test sections endpoint with invalid ID."""
         response = test_client.get("/api/sections/invalid")
         assert response.status_code == 422
 
-    @patch('src.app.services.rag_chat.RAGChatService.chat')
-    def test_chat_endpoint_success(self, mock_chat, test_client, sample_video):
+    def test_chat_endpoint_success(self, mocker, test_client, sample_video):
         """Test successful chat interaction."""
-        # Mock chat response
-        mock_response = Mock()
-        mock_response.response = "This is a test response"
-        mock_response.citations = [{"timestamp": 60.0, "content": "test"}]
-        mock_response.conversation_id = "test-conv-id"
-        mock_response.context_used = Mock()
-        mock_response.context_used.video_info = {"title": "Test Video"}
-        mock_response.context_used.combined_score = 0.85
-        mock_response.context_used.text_results = []
-        mock_response.context_used.visual_results = []
-        
-        mock_chat.return_value = mock_response
+        mock_langchain = mocker.patch('src.app.api.routes.LangChainVideoService', autospec=True)
+        mock_langchain.return_value.ask_question.return_value = _CHAT_MOCK_RESPONSE
         
         response = test_client.post(
             f"/api/chat/{sample_video.id}",
-            json={"message": "Tell me about this video"}
+            json={"message": "Tell me about this video", "conversation_id": None}
         )
         
         assert response.status_code == 200
         data = response.json()
         assert data["response"] == "This is a test response"
-        assert len(data["citations"]) == 1
-        assert data["conversation_id"] == "test-conv-id"
+        assert data["success"] is True
+        assert len(data["sources"]) == 1
 
     def test_chat_endpoint_validation(self, test_client):
         """Test chat endpoint input validation."""
@@ -121,36 +147,104 @@ class TestAPIEndpoints:
             "/api/chat/999",
             json={"message": "test message"}
         )
-        assert response.status_code == 500
+        assert response.status_code == 404
         assert "Video not found" in response.json()["detail"]
 
-    @patch('src.app.services.visual_search.VisualSearchService.search_by_text_query')
-    def test_visual_search_endpoint_success(self, mock_search, test_client):
+    def test_visual_search_endpoint_success(self, mocker, test_client, sample_frame):
         """Test successful visual search."""
-        mock_search.return_value = {
-            "video_id": 1,
-            "query": "test query",
-            "search_type": "hybrid",
-            "total_results": 1,
-            "results": [
+        mocker.patch(
+            'src.app.services.text_embedding_batcher.TextEmbeddingBatcher.embed',
+            return_value=np.zeros(512, dtype=np.float32)
+        )
+        mocker.patch(
+            'src.app.services.simple_embeddings.SimpleEmbeddingService.search_visual_content',
+            return_value=[
                 {
-                    "frame_id": 1,
-                    "timestamp": 60.0,
-                    "score": 0.9,
-                    "match_type": "text"
+                    "frame_id": sample_frame.id,
+                    "timestamp": sample_frame.timestamp,
+                    "path": sample_frame.path,
+                    "similarity": 0.9
                 }
             ]
-        }
+        )
         
         response = test_client.get(
-            "/api/visual-search/1?query=test%20query&search_type=hybrid&limit=10"
+            f"/api/visual-search/{sample_frame.video_id}?query=test%20query&search_type=visual&limit=10"
         )
         
         assert response.status_code == 200
         data = response.json()
-        assert data["video_id"] == 1
         assert data["query"] == "test query"
-        assert len(data["results"]) == 1
+        assert data["search_type"] == "visual"
+        assert data["total_results"] == 1
+        assert data["results"][0]["frame_id"] == sample_frame.id
+        assert data["results"][0]["score"] == 0.9
+        assert data["results"][0]["match_type"] == "visual"
+
+    def test_visual_search_endpoint_video_not_found(self, test_client):
+        """Test visual search with non-existent video."""
+        response = test_client.get("/api/visual-search/999?query=test")
+        assert response.status_code == 404
+        assert "Video not found" in response.json()["detail"]
+
+    def test_visual_search_stream_hybrid(self, mocker, test_client, sample_frame):
+        """The stream sends CLIP hits before the LangChain context, then closes with done."""
+        mocker.patch(
+            'src.app.services.text_embedding_batcher.TextEmbeddingBatcher.embed',
+            return_value=np.zeros(512, dtype=np.float32)
+        )
+        mocker.patch(
+            'src.app.services.simple_embeddings.SimpleEmbeddingService.search_visual_content',
+            return_value=[
+                {
+                    "frame_id": sample_frame.id,
+                    "timestamp": sample_frame.timestamp,
+                    "path": sample_frame.path,
+                    "similarity": 0.9
+                }
+            ]
+        )
+        mocker.patch('src.app.api.routes._ask_question', return_value=_CHAT_MOCK_RESPONSE)
+        
+        response = test_client.get(f"/api/visual-search/{sample_frame.video_id}/stream?query=test")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"].startswith("text/event-stream")
+        events = _sse_events(response.text)
+        assert [event for event, _ in events] == ["hit", "context", "done"]
+        assert events[0][1][0]["frame_id"] == sample_frame.id
+        assert events[0][1][0]["match_type"] == "hybrid"
+        assert events[1][1] == "This is a test response"
+        assert events[2][1] == {"query": "test", "search_type": "hybrid"}
+
+    def test_visual_search_stream_text(self, mocker, test_client, sample_video):
+        """Text-only streams send a single answer event before done."""
+        mocker.patch('src.app.api.routes._ask_question', return_value=_CHAT_MOCK_RESPONSE)
+        
+        response = test_client.get(f"/api/visual-search/{sample_video.id}/stream?query=test&search_type=text")
+        
+        events = _sse_events(response.text)
+        assert [event for event, _ in events] == ["answer", "done"]
+        assert events[0][1]["answer"] == "This is a test response"
+        assert events[0][1]["success"] is True
+
+    def test_visual_search_stream_error_still_terminates(self, mocker, test_client, sample_video):
+        """A failed search sends an error event and still closes with done."""
+        mocker.patch(
+            'src.app.services.text_embedding_batcher.TextEmbeddingBatcher.embed',
+            side_effect=Exception("CLIP unavailable")
+        )
+        
+        response = test_client.get(f"/api/visual-search/{sample_video.id}/stream?query=test&search_type=visual")
+        
+        events = _sse_events(response.text)
+        assert [event for event, _ in events] == ["error", "done"]
+        assert events[0][1] == "Search failed: CLIP unavailable"
+
+    def test_visual_search_stream_video_not_found(self, test_client):
+        """Unknown videos get a plain 404 instead of a stream."""
+        response = test_client.get("/api/visual-search/999/stream?query=test")
+        assert response.status_code == 404
 
     def test_visual_search_endpoint_validation(self, test_client):
         """Test visual search endpoint parameter validation."""
@@ -166,34 +260,51 @@ class TestAPIEndpoints:
         response = test_client.get("/api/visual-search/1?query=test&limit=-1")
         # Should still work as FastAPI converts/validates
 
-    @patch('src.app.services.visual_search.VisualSearchService.get_video_frame_summary')
-    def test_visual_search_summary_endpoint(self, mock_summary, test_client):
+    def test_visual_search_summary_endpoint(self, mocker, test_client, sample_frame_images):
         """Test visual search summary endpoint."""
-        mock_summary.return_value = {
-            "video_id": 1,
-            "total_frames": 5,
-            "duration_covered": 300.0,
-            "frame_intervals": [10, 10, 10, 10],
-            "sample_frames": []
-        }
+        mocker.patch('src.app.api.routes._frame_summary_cache', TTLCache(maxsize=1024, ttl=60))
         
         response = test_client.get("/api/visual-search/1/summary")
         
         assert response.status_code == 200
         data = response.json()
         assert data["video_id"] == 1
-        assert data["total_frames"] == 5
-        assert data["duration_covered"] == 300.0
+        assert data["total_frames"] == 3
+        assert data["duration_covered"] == 20.0
+        assert data["frame_intervals"] == [10.0, 10.0]
+        assert [frame["frame_id"] for frame in data["sample_frames"]] == [10, 11, 12]
+
+    def test_visual_search_summary_evicted_after_extract_frames(
+        self, mocker, test_client, test_db_session, sample_frame_images
+    ):
+        """A cached summary is rebuilt once frames are re-extracted."""
+        mocker.patch('src.app.api.routes._frame_summary_cache', TTLCache(maxsize=1024, ttl=60))
+        mocker.patch(
+            'src.app.services.frame_extractor.FrameExtractorService.process_video_frames',
+            return_value={"frame_count": 4, "already_extracted": False}
+        )
+        
+        assert test_client.get("/api/visual-search/1/summary").json()["total_frames"] == 3
+        
+        test_db_session.execute(insert(Frame).values(
+            id=13, video_id=1, timestamp=30.0, path=sample_frame_images[0].path
+        ))
+        # Still served from the cache
+        assert test_client.get("/api/visual-search/1/summary").json()["total_frames"] == 3
+        
+        response = test_client.post("/api/videos/1/extract-frames")
+        assert response.status_code == 200
+        
+        data = test_client.get("/api/visual-search/1/summary").json()
+        assert data["total_frames"] == 4
+        assert data["duration_covered"] == 30.0
 
     def test_visual_search_timestamp_endpoint(self, test_client, sample_frame):
-        """Test visual search timestamp endpoint."""
+        """Timestamp search is still a stub and returns no results."""
         response = test_client.get(f"/api/visual-search/{sample_frame.video_id}/timestamp/60.0")
         
         assert response.status_code == 200
-        data = response.json()
-        assert data["video_id"] == sample_frame.video_id
-        assert data["search_type"] == "timestamp"
-        assert data["target_timestamp"] == 60.0
+        assert response.json() == {"message": "Timestamp search not implemented", "results": []}
 
     def test_visual_search_thumbnails_endpoint_validation(self, test_client):
         """Test thumbnails endpoint parameter validation."""
@@ -205,21 +316,66 @@ class TestAPIEndpoints:
         response = test_client.get("/api/visual-search/1/thumbnails?frame_ids=")
         # Should return empty result but not error
 
-    @patch('src.app.services.visual_search.VisualSearchService.get_frame_thumbnails')
-    def test_visual_search_thumbnails_endpoint_success(self, mock_thumbnails, test_client):
-        """Test successful thumbnail generation."""
-        mock_thumbnails.return_value = {
-            1: "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQEAYABgAAD/",
-            2: "data:image/jpeg;base64,/9j/4AAQSkZJRgABAQEAYABgAAD/"
-        }
-        
-        response = test_client.get("/api/visual-search/1/thumbnails?frame_ids=1,2&size=200x150")
+    def test_visual_search_thumbnails_invalid_frame_ids(self, test_client):
+        """Non-integer frame_ids are rejected."""
+        response = test_client.get("/api/visual-search/1/thumbnails?frame_ids=1,abc")
+        assert response.status_code == 422
+        assert "frame_ids" in response.json()["detail"]
+
+    def test_visual_search_thumbnails_out_of_range_frame_ids(self, test_client):
+        """Frame ids that don't fit in int64 are rejected, not a 500."""
+        response = test_client.get("/api/visual-search/1/thumbnails?frame_ids=99999999999999999999")
+        assert response.status_code == 422
+        assert "frame_ids" in response.json()["detail"]
+
+    def test_visual_search_thumbnails_endpoint_success(self, test_client, sample_frame_images):
+        """Thumbnails come back as JPEG data URIs keyed by frame id."""
+        response = test_client.get("/api/visual-search/1/thumbnails?frame_ids=10,11,999&size=200x150")
         
         assert response.status_code == 200
         data = response.json()
         assert data["video_id"] == 1
-        assert len(data["thumbnails"]) == 2
         assert data["total_thumbnails"] == 2
+        assert set(data["thumbnails"]) == {"10", "11"}
+        for data_uri in data["thumbnails"].values():
+            assert data_uri.startswith("data:image/jpeg;base64,")
+            jpeg = base64.b64decode(data_uri.split(",", 1)[1])
+            assert Image.open(io.BytesIO(jpeg)).size == (200, 113)
+
+    def test_visual_search_thumbnails_multipart(self, test_client, sample_frame_images):
+        """Clients accepting multipart/mixed get raw JPEG parts."""
+        response = test_client.get(
+            "/api/visual-search/1/thumbnails?frame_ids=10,11,12",
+            headers={"Accept": "multipart/mixed"}
+        )
+        
+        assert response.status_code == 200
+        content_type = response.headers["content-type"]
+        assert content_type.startswith("multipart/mixed; boundary=")
+        boundary = content_type.split("boundary=", 1)[1].encode()
+        
+        body = response.content
+        assert body.endswith(b"--" + boundary + b"--\r\n")
+        parts = body.split(b"--" + boundary)[1:-1]
+        frame_ids = []
+        for part in parts:
+            headers, jpeg = part.split(b"\r\n\r\n", 1)
+            assert b"Content-Type: image/jpeg" in headers
+            frame_ids.append(int(headers.split(b"X-Frame-Id: ", 1)[1]))
+            assert jpeg.startswith(b"\xff\xd8")
+        assert sorted(frame_ids) == [10, 11, 12]
+
+    def test_visual_search_thumbnail_jpeg(self, test_client, sample_frame_images):
+        """A single thumbnail is served as raw, cacheable JPEG."""
+        response = test_client.get("/api/visual-search/1/thumbnails/10.jpg?size=100x100")
+        
+        assert response.status_code == 200
+        assert response.headers["content-type"] == "image/jpeg"
+        assert response.headers["cache-control"] == "public, max-age=86400"
+        assert Image.open(io.BytesIO(response.content)).size == (100, 56)
+        
+        response = test_client.get("/api/visual-search/1/thumbnails/999.jpg")
+        assert response.status_code == 404
 
     def test_frames_endpoint_with_data(self, test_client, sample_frame):
         """Test frames endpoint with existing data."""
@@ -231,16 +387,44 @@ class TestAPIEndpoints:
         assert data[0]["id"] == sample_frame.id
         assert data[0]["timestamp"] == sample_frame.timestamp
 
+    def test_frames_endpoint_etag_not_modified(self, test_client, test_db_session, sample_frame):
+        """Polling with a matching ETag gets an empty 304 until the frames change."""
+        response = test_client.get(f"/api/frames/{sample_frame.video_id}")
+        assert response.status_code == 200
+        etag = response.headers["etag"]
+        assert response.headers["cache-control"] == "no-cache"
+        
+        response = test_client.get(
+            f"/api/frames/{sample_frame.video_id}",
+            headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 304
+        assert response.content == b""
+        assert response.headers["etag"] == etag
+        
+        test_db_session.execute(insert(Frame).values(
+            id=2, video_id=sample_frame.video_id, timestamp=70.0, path="/test/path/frame_70.jpg"
+        ))
+        response = test_client.get(
+            f"/api/frames/{sample_frame.video_id}",
+            headers={"If-None-Match": etag}
+        )
+        assert response.status_code == 200
+        assert response.headers["etag"] != etag
+        assert len(response.json()) == 2
+
     def test_frames_endpoint_no_data(self, test_client):
         """Test frames endpoint with no data."""
         response = test_client.get("/api/frames/999")
-        assert response.status_code == 500
-        assert "No frames found" in response.json()["detail"]
+        assert response.status_code == 404
+        assert "Video not found" in response.json()["detail"]
 
-    @patch('src.app.services.frame_extractor.FrameExtractorService.process_video_frames')
-    def test_extract_frames_endpoint_success(self, mock_extract, test_client, sample_video):
+    def test_extract_frames_endpoint_success(self, mocker, test_client, sample_video):
         """Test successful frame extraction."""
-        mock_extract.return_value = [Mock(), Mock(), Mock()]  # 3 frames
+        mocker.patch(
+            'src.app.services.frame_extractor.FrameExtractorService.process_video_frames',
+            return_value={"frame_count": 3, "already_extracted": False}
+        )
         
         response = test_client.post(
             f"/api/videos/{sample_video.id}/extract-frames",
@@ -249,9 +433,35 @@ class TestAPIEndpoints:
         
         assert response.status_code == 200
         data = response.json()
-        assert data["message"] == "Frame extraction completed"
+        assert data["message"] == "Frame extraction completed successfully"
         assert data["video_id"] == sample_video.id
-        assert data["frames_extracted"] == 3
+        assert data["extracted_count"] == 3
+        assert data["status"] == "success"
+
+    def test_extract_frames_serialized_per_video(self, mocker, test_db_session, sample_video):
+        """Concurrent extractions of one video run one after another."""
+        running = []
+        overlaps = []
+        
+        def fake_extract(session_factory, video_id):
+            running.append(video_id)
+            overlaps.append(len(running))
+            time.sleep(0.05)
+            running.remove(video_id)
+            return {"video_id": video_id, "status": "success"}
+        
+        mocker.patch('src.app.api.routes._extract_frames', side_effect=fake_extract)
+        
+        async def extract_concurrently():
+            return await asyncio.gather(*[
+                routes.extract_frames(sample_video.id, db=test_db_session, session_factory=None)
+                for _ in range(3)
+            ])
+        
+        results = asyncio.run(extract_concurrently())
+        
+        assert [result["status"] for result in results] == ["success"] * 3
+        assert max(overlaps) == 1
 
     def test_extract_frames_endpoint_video_not_found(self, test_client):
         """Test frame extraction with non-existent video."""
@@ -262,23 +472,144 @@ class TestAPIEndpoints:
         assert response.status_code == 404
         assert "Video not found" in response.json()["detail"]
 
-    @patch('src.app.services.embeddings.EmbeddingService.process_video_text_embeddings')
-    @patch('src.app.services.embeddings.EmbeddingService.process_video_visual_embeddings')
-    def test_generate_embeddings_endpoint_success(self, mock_visual, mock_text, test_client):
+    def test_generate_embeddings_endpoint_success(self, mocker, test_client, sample_frame):
         """Test successful embedding generation."""
-        mock_text.return_value = ["point1", "point2"]
-        mock_visual.return_value = ["point3", "point4", "point5"]
+        mocker.patch(
+            'src.app.services.simple_embeddings.SimpleEmbeddingService.generate_frame_embeddings',
+            return_value={"success": True, "processed": 1, "total_frames": 1}
+        )
+        mock_langchain = mocker.patch('src.app.api.routes.LangChainVideoService', autospec=True)
+        mock_langchain.return_value.is_processed.return_value = True
+        
+        response = test_client.post(
+            f"/api/videos/{sample_frame.video_id}/generate-embeddings",
+            json={"include_text": True, "include_visual": True}
+        )
+        
+        assert response.status_code == 200
+        data = response.json()
+        assert data["status"] == "success"
+        assert data["visual"] == {"success": True, "processed": 1, "total_frames": 1}
+        assert data["text"]["success"] is True
+
+    def test_generate_embeddings_text_failure_keeps_visual(self, mocker, test_client, sample_frame):
+        """A failed transcript pass is reported without failing the CLIP pass."""
+        mocker.patch(
+            'src.app.services.simple_embeddings.SimpleEmbeddingService.generate_frame_embeddings',
+            return_value={"success": True, "processed": 1, "total_frames": 1}
+        )
+        mock_langchain = mocker.patch('src.app.api.routes.LangChainVideoService', autospec=True)
+        mock_langchain.return_value.is_processed.side_effect = Exception("OpenAI unavailable")
         
         response = test_client.post(
-            "/api/videos/1/generate-embeddings",
+            f"/api/videos/{sample_frame.video_id}/generate-embeddings",
             json={"include_text": True, "include_visual": True}
         )
         
         assert response.status_code == 200
         data = response.json()
-        assert data["message"] == "Embeddings generated successfully"
-        assert data["text_embeddings"] == 2
-        assert data["visual_embeddings"] == 3
+        assert data["status"] == "partial"
+        assert data["visual"]["success"] is True
+        assert data["text"] == {"success": False, "error": "OpenAI unavailable"}
+
+    def test_body_models_parse_with_orjson(self, mocker, test_client, sample_frame):
+        """Body models on the router are parsed through ORJSONRequest."""
+        mock_embeddings = mocker.patch(
+            'src.app.services.simple_embeddings.SimpleEmbeddingService.generate_frame_embeddings',
+            return_value={"success": True, "processed": 1, "total_frames": 1}
+        )
+        orjson_loads = mocker.spy(routes.orjson, "loads")
+        
+        response = test_client.post(
+            f"/api/videos/{sample_frame.video_id}/generate-embeddings",
+            json={"include_text": False, "include_visual": False}
+        )
+        
+        assert response.status_code == 200
+        orjson_loads.assert_called_once()
+        mock_embeddings.assert_not_called()
+
+    def test_malformed_json_body_is_rejected(self, test_client, sample_frame):
+        """orjson decode errors still surface as FastAPI's 422 validation error."""
+        response = test_client.post(
+            f"/api/videos/{sample_frame.video_id}/generate-embeddings",
+            content=b"{not json",
+            headers={"Content-Type": "application/json"}
+        )
+        
+        assert response.status_code == 422
+        assert response.json()["detail"][0]["type"] == "json_invalid"
+
+    def test_generate_embeddings_endpoint_video_not_found(self, test_client):
+        """Test embedding generation with non-existent video."""
+        response = test_client.post(
+            "/api/videos/999/generate-embeddings",
+            json={"include_text": True, "include_visual": True}
+        )
+        assert response.status_code == 404
+        assert "Video not found" in response.json()["detail"]
+
+    def test_json_only_middleware_rejects_non_json(self, test_client):
+        """Non-JSON POSTs to upload and chat are rejected before the body is read."""
+        for path in ("/api/upload", "/api/chat/1"):
+            response = test_client.post(
+                path,
+                content=b"message=hello",
+                headers={"Content-Type": "application/x-www-form-urlencoded"}
+            )
+            assert response.status_code == 422
+            assert response.json()["detail"][0]["loc"] == ["body"]
+
+    def test_json_only_middleware_allows_json_with_charset(self, test_client, sample_video):
+        """A JSON content type with parameters reaches the endpoint."""
+        response = test_client.post(
+            f"/api/chat/{sample_video.id}",
+            content=b'{"message": ""}',
+            headers={"Content-Type": "application/json; charset=utf-8"}
+        )
+        assert response.status_code == 400
+        assert response.json()["detail"] == "Message is required"
+
+    def test_json_only_middleware_ignores_other_paths(self, test_client):
+        """Routes outside the guarded paths don't require a JSON body."""
+        response = test_client.post(
+            "/api/videos/999/extract-frames",
+            content=b"interval=10",
+            headers={"Content-Type": "text/plain"}
+        )
+        assert response.status_code == 404
+
+    def test_langchain_status_endpoint(self, mocker, test_client):
+        """Status polling reads the vector store without building the OpenAI-backed service."""
+        mock_langchain = mocker.patch('src.app.api.routes.LangChainVideoService')
+        mocker.patch('src.app.api.routes.transcript_is_processed', return_value=True)
+        
+        response = test_client.get("/api/langchain/status/1")
+        
+        assert response.status_code == 200
+        assert response.json() == {"video_id": 1, "processed": True, "chroma_path": "storage/chroma"}
+        mock_langchain.assert_not_called()
+
+    def test_gzip_compresses_json_only(self, test_client, sample_frame_images):
+        """Large JSON is gzipped; JPEG thumbnails are sent as they are."""
+        response = test_client.get("/openapi.json", headers={"Accept-Encoding": "gzip"})
+        assert response.status_code == 200
+        assert response.headers["content-encoding"] == "gzip"
+        
+        response = test_client.get(
+            "/api/visual-search/1/thumbnails/10.jpg?size=640x360",
+            headers={"Accept-Encoding": "gzip"}
+        )
+        assert response.status_code == 200
+        assert len(response.content) >= 1024
+        assert "content-encoding" not in response.headers
+        
+        response = test_client.get(
+            "/api/visual-search/1/thumbnails?frame_ids=10,11,12&size=640x360",
+            headers={"Accept-Encoding": "gzip", "Accept": "multipart/mixed"}
+        )
+        assert response.status_code == 200
+        assert "content-encoding" not in response.headers
 
     def test_cors_headers(self, test_client):
         """Test CORS headers are present."""
@@ -0,0 +1,33 @@
+from src.app.services.frame_extractor import FrameExtractorService
+
+
+class TestFramesDir:
+    """Unit tests for the per-video frame output directory."""
+
+    def setup_method(self):
+        self.service = FrameExtractorService(db=None)
+
+    def test_prepare_removes_stale_frames(self):
+        """Leftover files from an earlier run are cleared before extraction."""
+        stale_dir = self.service.frames_dir / "7"
+        stale_dir.mkdir(parents=True, exist_ok=True)
+        (stale_dir / "frame_000001.jpg").write_bytes(b"old")
+        (stale_dir / "frame_000_000001.jpg").write_bytes(b"old")
+        
+        video_frames_dir = self.service._prepare_frames_dir(7)
+        
+        assert video_frames_dir == stale_dir
+        assert list(video_frames_dir.iterdir()) == []
+
+    def test_collect_only_keyframe_output(self):
+        """Only frame_%06d.jpg files are collected, in order, with interval timestamps."""
+        video_frames_dir = self.service._prepare_frames_dir(8)
+        for name in ("frame_000002.jpg", "frame_000001.jpg", "frame_000_000001.jpg", "frame_000001.png"):
+            (video_frames_dir / name).write_bytes(b"")
+        
+        frames = self.service._collect_frames(video_frames_dir, interval=10)
+        
+        assert frames == [
+            (str(video_frames_dir / "frame_000001.jpg"), 0.0),
+            (str(video_frames_dir / "frame_000002.jpg"), 10.0),
+        ]
@@ -0,0 +1,92 @@
+from types import SimpleNamespace
+
+from langchain.docstore.document import Document
+
+from src.app.services.langchain_service import LangChainVideoService, _drop_redundant_chunks
+
+
+def _build_chunk_docs(segments, chunks):
+    """Run _build_chunk_docs with a splitter that returns fixed chunks."""
+    service = SimpleNamespace(text_splitter=SimpleNamespace(split_text=lambda text: chunks))
+    return LangChainVideoService._build_chunk_docs(service, 1, segments)
+
+
+class TestBuildChunkDocs:
+    """Unit tests for mapping transcript chunks back to segment start times."""
+
+    def test_chunks_take_start_of_segment_they_begin_in(self):
+        """Each chunk gets the start time of the segment its first character falls in."""
+        segments = [
+            {"text": "Hello everyone", "start": 0.0},
+            {"text": "Welcome to this video", "start": 2.0},
+            {"text": "   ", "start": 4.0},
+            {"text": "Today we discuss", "start": 125.0},
+        ]
+        chunks = [
+            "Hello everyone Welcome",
+            "to this video Today",
+            "Today we discuss",
+        ]
+        
+        docs = _build_chunk_docs(segments, chunks)
+        
+        assert [doc.page_content for doc in docs] == chunks
+        assert [doc.metadata["start_time"] for doc in docs] == [0.0, 2.0, 125.0]
+        assert [doc.metadata["timestamp"] for doc in docs] == ["00:00", "00:02", "02:05"]
+        assert [doc.metadata["chunk_id"] for doc in docs] == [0, 1, 2]
+        assert all(doc.metadata["video_id"] == 1 for doc in docs)
+
+    def test_repeated_text_maps_to_later_segment(self):
+        """Identical chunks are located in order rather than all matching the first one."""
+        segments = [
+            {"text": "intro text", "start": 0.0},
+            {"text": "intro text", "start": 30.0},
+        ]
+        
+        docs = _build_chunk_docs(segments, ["intro text", "intro text"])
+        
+        assert [doc.metadata["start_time"] for doc in docs] == [0.0, 30.0]
+
+    def test_no_segments(self):
+        """An empty transcript produces no documents."""
+        assert _build_chunk_docs([], []) == []
+
+
+class TestDropRedundantChunks:
+    """Unit tests for near-duplicate chunk filtering."""
+
+    def _docs(self, count):
+        return [Document(page_content=f"chunk {i}", metadata={"chunk_id": i}) for i in range(count)]
+
+    def test_drops_near_duplicates_of_kept_chunks(self):
+        """Chunks almost parallel to an earlier kept chunk are dropped."""
+        docs = self._docs(4)
+        vectors = [[1.0, 0.0], [0.99, 0.01], [0.0, 1.0], [2.0, 0.0]]
+        
+        kept_docs, kept_vectors = _drop_redundant_chunks(docs, vectors)
+        
+        assert [doc.metadata["chunk_id"] for doc in kept_docs] == [0, 2]
+        assert kept_vectors == [[1.0, 0.0], [0.0, 1.0]]
+
+    def test_keeps_distinct_chunks(self):
+        """Dissimilar chunks are all kept, in order."""
+        docs = self._docs(3)
+        vectors = [[1.0, 0.0, 0.0], [0.0, 1.0, 0.0], [0.7, 0.7, 0.0]]
+        
+        kept_docs, kept_vectors = _drop_redundant_chunks(docs, vectors)
+        
+        assert kept_docs == docs
+        assert kept_vectors == vectors
+
+    def test_zero_vector_does_not_divide_by_zero(self):
+        """An all-zero embedding is kept rather than producing NaNs."""
+        docs = self._docs(2)
+        vectors = [[0.0, 0.0], [1.0, 0.0]]
+        
+        kept_docs, _ = _drop_redundant_chunks(docs, vectors)
+        
+        assert kept_docs == docs
+
+    def test_empty(self):
+        """No chunks in, no chunks out."""
+        assert _drop_redundant_chunks([], []) == ([], [])
@@ -0,0 +1,63 @@
+import pytest
+from unittest.mock import MagicMock
+
+from cachetools import TTLCache
+
+from src.app.services import qa_cache
+
+_ANSWER = {"success": True, "answer": "It is about testing", "sources": []}
+
+
+@pytest.fixture(autouse=True)
+def empty_cache(monkeypatch):
+    """Give each test its own empty answer cache."""
+    monkeypatch.setattr(qa_cache, "_cache", TTLCache(maxsize=16, ttl=60))
+
+
+class TestQACache:
+    """Unit tests for the QA answer cache."""
+
+    def test_repeated_question_hits_cache(self):
+        """The QA chain runs once for a repeated question."""
+        service = MagicMock()
+        service.ask_question.return_value = _ANSWER
+
+        first = qa_cache.cached_ask_question(service, 1, "What is this about?")
+        second = qa_cache.cached_ask_question(service, 1, "What is this about?")
+
+        assert first == second == _ANSWER
+        service.ask_question.assert_called_once_with(1, "What is this about?")
+
+    def test_question_is_normalized(self):
+        """Case and surrounding whitespace don't create separate entries."""
+        qa_cache.set_answer(1, "  What is this about?\n", _ANSWER)
+
+        assert qa_cache.get_answer(1, "what is this about?") == _ANSWER
+
+    def test_answers_are_scoped_per_video(self):
+        """The same question about another video is a miss."""
+        qa_cache.set_answer(1, "What is this about?", _ANSWER)
+
+        assert qa_cache.get_answer(2, "What is this about?") is None
+
+    def test_failed_answers_are_not_cached(self):
+        """A failed answer is retried on the next ask."""
+        service = MagicMock()
+        service.ask_question.return_value = {"success": False, "error": "OpenAI unavailable"}
+
+        qa_cache.cached_ask_question(service, 1, "What is this about?")
+        qa_cache.cached_ask_question(service, 1, "What is this about?")
+
+        assert service.ask_question.call_count == 2
+
+    def test_invalidate_video_drops_only_that_video(self):
+        """Invalidating a video leaves other videos' answers in place."""
+        qa_cache.set_answer(1, "first question", _ANSWER)
+        qa_cache.set_answer(1, "second question", _ANSWER)
+        qa_cache.set_answer(2, "first question", _ANSWER)
+
+        qa_cache.invalidate_video(1)
+
+        assert qa_cache.get_answer(1, "first question") is None
+        assert qa_cache.get_answer(1, "second question") is None
+        assert qa_cache.get_answer(2, "first question") == _ANSWER
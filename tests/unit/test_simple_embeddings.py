@@ -0,0 +1,95 @@
+import pytest
+import numpy as np
+
+from src.app.services.simple_embeddings import (
+    RERANK_CANDIDATES,
+    SQ8_SCAN_BLOCK,
+    SimpleEmbeddingService,
+    _quantize_sq8,
+)
+
+
+def _normalized(rows: int, dims: int, seed: int = 0) -> np.ndarray:
+    matrix = np.random.default_rng(seed).standard_normal((rows, dims)).astype(np.float32)
+    return matrix / np.linalg.norm(matrix, axis=1, keepdims=True)
+
+
+def _cpu_index(matrix: np.ndarray):
+    codes, scale = _quantize_sq8(matrix)
+    return {"codes": codes, "scale": scale, "full": matrix.astype(np.float16)}
+
+
+class TestQuantizeSQ8:
+    """Unit tests for int8 scalar quantization."""
+
+    def test_round_trip_error_within_half_step(self):
+        """Dequantized values are within half a quantization step, across scan blocks."""
+        matrix = _normalized(SQ8_SCAN_BLOCK + 100, 16)
+        
+        codes, scale = _quantize_sq8(matrix)
+        
+        assert codes.dtype == np.int8
+        assert codes.shape == matrix.shape
+        assert scale.dtype == np.float32
+        assert scale.shape == (16,)
+        error = np.abs(codes.astype(np.float32) * scale - matrix)
+        assert np.all(error <= scale / 2 + 1e-6)
+
+    def test_column_max_maps_to_127(self):
+        """The largest magnitude in each dimension uses the full int8 range."""
+        matrix = _normalized(50, 8)
+        
+        codes, _ = _quantize_sq8(matrix)
+        
+        assert np.all(np.max(np.abs(codes.astype(np.int16)), axis=0) == 127)
+
+    def test_zero_column_gets_unit_scale(self):
+        """An all-zero dimension doesn't divide by zero."""
+        matrix = _normalized(10, 4)
+        matrix[:, 2] = 0.0
+        
+        codes, scale = _quantize_sq8(matrix)
+        
+        assert scale[2] == 1.0
+        assert np.all(codes[:, 2] == 0)
+
+
+class TestScoreFrames:
+    """Unit tests for CPU int8 scan + float rerank scoring."""
+
+    def setup_method(self):
+        self.service = SimpleEmbeddingService.__new__(SimpleEmbeddingService)
+
+    def test_finds_exact_match(self):
+        """A query equal to a stored frame scores that frame highest."""
+        matrix = _normalized(500, 32)
+        
+        candidates, sims = self.service._score_frames(_cpu_index(matrix), matrix[123], limit=5)
+        
+        assert candidates[np.argmax(sims)] == 123
+        assert np.max(sims) == pytest.approx(1.0, abs=1e-2)
+
+    def test_reranks_with_full_precision(self):
+        """Candidate scores are exact dot products with the stored vectors."""
+        matrix = _normalized(500, 32)
+        query = _normalized(1, 32, seed=1)[0]
+        index = _cpu_index(matrix)
+        
+        candidates, sims = self.service._score_frames(index, query, limit=5)
+        
+        expected = index["full"][candidates].astype(np.float32) @ query
+        np.testing.assert_allclose(sims, expected, rtol=1e-6)
+        assert np.all(np.diff(candidates) > 0)
+
+    @pytest.mark.parametrize("frames, limit, expected", [
+        (500, 5, RERANK_CANDIDATES),
+        (500, RERANK_CANDIDATES + 10, RERANK_CANDIDATES + 10),
+        (10, 5, 10),
+    ])
+    def test_candidate_count(self, frames, limit, expected):
+        """At least RERANK_CANDIDATES (or limit) frames are rescored, capped at the frame count."""
+        matrix = _normalized(frames, 32)
+        
+        candidates, sims = self.service._score_frames(_cpu_index(matrix), matrix[0], limit=limit)
+        
+        assert len(candidates) == len(sims) == expected
@@ -0,0 +1,89 @@
+import asyncio
+
+import numpy as np
+
+from src.app.services.text_embedding_batcher import TextEmbeddingBatcher
+
+
+class FakeEmbeddingService:
+    """Records each batch and encodes a query as a vector filled with its length."""
+
+    def __init__(self):
+        self.batches = []
+
+    def get_cached_text_embedding(self, query):
+        return None
+
+    def encode_text_batch(self, queries):
+        self.batches.append(list(queries))
+        return [np.full(4, len(query), dtype=np.float32) for query in queries]
+
+
+class TestTextEmbeddingBatcher:
+    """Unit tests for coalescing concurrent CLIP text encodes."""
+
+    def test_concurrent_queries_share_batches(self):
+        """Concurrent queries are encoded in batches of at most max_batch_size."""
+        service = FakeEmbeddingService()
+        queries = ["q" * length for length in range(1, 11)]
+
+        async def embed_all():
+            batcher = TextEmbeddingBatcher(service, max_batch_size=4, max_wait=0.05)
+            return await asyncio.gather(*[batcher.embed(query) for query in queries])
+
+        asyncio.run(embed_all())
+
+        assert [len(batch) for batch in service.batches] == [4, 4, 2]
+        assert sorted(q for batch in service.batches for q in batch) == sorted(queries)
+
+    def test_each_caller_gets_its_own_embedding(self):
+        """Results are routed back to the query that asked for them."""
+        service = FakeEmbeddingService()
+        queries = ["q" * length for length in range(1, 11)]
+
+        async def embed_all():
+            batcher = TextEmbeddingBatcher(service, max_batch_size=4, max_wait=0.05)
+            return await asyncio.gather(*[batcher.embed(query) for query in queries])
+
+        results = asyncio.run(embed_all())
+
+        for query, embedding in zip(queries, results):
+            assert np.all(embedding == len(query))
+
+    def test_worker_restarts_after_idle(self):
+        """The worker exits once idle and the next query starts a new one."""
+        service = FakeEmbeddingService()
+
+        async def embed_with_pause():
+            batcher = TextEmbeddingBatcher(service, max_batch_size=4, max_wait=0.01)
+            first = await batcher.embed("a")
+            await asyncio.sleep(0.1)
+            idle_worker = batcher._worker
+            second = await batcher.embed("bb")
+            return first, idle_worker, second
+
+        first, idle_worker, second = asyncio.run(embed_with_pause())
+
+        assert idle_worker is None
+        assert np.all(first == 1)
+        assert np.all(second == 2)
+        assert service.batches == [["a"], ["bb"]]
+
+    def test_encode_failure_reaches_every_caller(self):
+        """A failed batch raises in each waiting caller instead of hanging them."""
+        service = FakeEmbeddingService()
+
+        def failing_encode(queries):
+            raise RuntimeError("CLIP failed")
+
+        service.encode_text_batch = failing_encode
+
+        async def embed_all():
+            batcher = TextEmbeddingBatcher(service, max_batch_size=4, max_wait=0.01)
+            return await asyncio.gather(
+                batcher.embed("a"), batcher.embed("b"), return_exceptions=True
+            )
+
+        results = asyncio.run(embed_all())
+
+        assert [str(result) for result in results] == ["CLIP failed", "CLIP failed"]